@@ -0,0 +1,168 @@
+"""
+Headless HTTP/JSON API over the same src/ modules the Streamlit app uses.
+
+Unlike the Streamlit app, a request here only runs the one function it
+needs instead of re-executing the whole script. Blocking DB, extraction and
+Gemini calls run in worker threads, bounded by the DB connection pool size,
+and chat replies can be streamed as they are generated.
+
+Run:        uvicorn api:app --workers 4
+Load test:  python -m benchmarks.api
+"""
+from contextlib import asynccontextmanager
+
+import anyio
+from fastapi import Depends, FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from pydantic import BaseModel
+
+from src import db
+from src.db import (
+    get_user, get_user_chats, save_chat, get_all_users, get_upload_jobs,
+    iter_chats_csv, verify_user_credentials, safe_initialize, PRIVATE_USER_FIELDS
+)
+from src.helper import ai_chat_response, ai_chat_response_stream, build_chat_prompt
+from src.llm_client import LLMError
+from src.upload_jobs import enqueue_upload, resume_pending_jobs
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await run_blocking(safe_initialize)
+    await run_blocking(resume_pending_jobs)
+    yield
+
+
+app = FastAPI(title="Assistant API", lifespan=lifespan)
+security = HTTPBasic()
+
+# One worker thread per pooled DB connection, so requests queue instead of opening more.
+db_limiter = anyio.CapacityLimiter(db.DB_POOL_SIZE)
+
+
+async def run_blocking(func, *args):
+    return await anyio.to_thread.run_sync(func, *args, limiter=db_limiter)
+
+
+async def current_user(credentials: HTTPBasicCredentials = Depends(security)):
+    if not await run_blocking(verify_user_credentials, credentials.username, credentials.password):
+        raise HTTPException(status_code=401, detail="Invalid email or password.")
+    user = await run_blocking(get_user, credentials.username)
+    if user.get("blocked"):
+        raise HTTPException(status_code=403, detail="Account is blocked.")
+    return user
+
+
+async def admin_user(user=Depends(current_user)):
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required.")
+    return user
+
+
+def public_user(user):
+    return {key: value for key, value in user.items() if key not in PRIVATE_USER_FIELDS}
+
+
+# === Chat ===
+
+class ChatRequest(BaseModel):
+    message: str
+    thread_id: str | None = None
+    stream: bool = False
+
+
+@app.post("/chat")
+async def chat(request: ChatRequest, user=Depends(current_user)):
+    message = request.message.strip()
+    if not message:
+        raise HTTPException(status_code=400, detail="Message is empty.")
+
+    past_chats = await run_blocking(lambda: get_user_chats(user["email"], limit=5))
+    prompt = build_chat_prompt(past_chats, message)
+
+    if not request.stream:
+        try:
+            response = await anyio.to_thread.run_sync(ai_chat_response, prompt)
+        except LLMError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+        await run_blocking(save_chat, user["email"], message, response, request.thread_id)
+        return {"response": response}
+
+    # Fetch the first chunk before answering, so a model that is down is still a 502
+    # rather than a 200 whose body ends abruptly.
+    iterator = ai_chat_response_stream(prompt)
+    try:
+        first = await anyio.to_thread.run_sync(next, iterator, None)
+    except LLMError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+    async def stream():
+        parts = []
+        chunk = first
+        while chunk is not None:
+            parts.append(chunk)
+            yield chunk
+            # A failure mid-stream propagates and aborts the response; the partial reply isn't saved.
+            chunk = await anyio.to_thread.run_sync(next, iterator, None)
+        await run_blocking(save_chat, user["email"], message, "".join(parts).strip(), request.thread_id)
+
+    return StreamingResponse(stream(), media_type="text/plain; charset=utf-8")
+
+
+@app.get("/chats")
+async def chats(limit: int = 50, offset: int = 0, user=Depends(current_user)):
+    rows = await run_blocking(lambda: get_user_chats(user["email"], limit=min(limit, 500), offset=offset))
+    return {"chats": rows}
+
+
+# === Files ===
+
+class _Upload:
+    # enqueue_upload expects Streamlit's UploadedFile interface: read(), name and type.
+    def __init__(self, upload: UploadFile):
+        self.file = upload.file
+        self.name = upload.filename or "upload"
+        self.type = upload.content_type or ""
+
+    def read(self, *args):
+        return self.file.read(*args)
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+
+JOB_FIELDS = ("id", "file_name", "file_type", "status", "error", "file_id", "created_at", "updated_at")
+
+
+@app.post("/files", status_code=202)
+async def upload_file(file: UploadFile = File(...), user=Depends(current_user)):
+    # Same path as the Streamlit uploader: spooled, queued and extracted by the upload workers.
+    job_id = await run_blocking(enqueue_upload, user["email"], _Upload(file))
+    return {"job_id": job_id, "file_name": file.filename, "status": "queued"}
+
+
+@app.get("/files/jobs")
+async def upload_jobs(limit: int = 20, user=Depends(current_user)):
+    jobs = await run_blocking(lambda: get_upload_jobs(user["email"], limit=min(limit, 100)))
+    return {"jobs": [{key: job[key] for key in JOB_FIELDS} for job in jobs]}
+
+
+# === Admin ===
+
+@app.get("/admin/users")
+async def users(admin=Depends(admin_user)):
+    return {"users": [public_user(u) for u in await run_blocking(get_all_users)]}
+
+
+@app.get("/admin/chats.csv")
+async def chats_csv(admin=Depends(admin_user)):
+    # Rows are read from a cursor as the response is sent, never held in memory all at once.
+    return StreamingResponse(
+        iter_chats_csv(), media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=chat_history.csv"},
+    )
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("api:app", host="0.0.0.0", port=8000)
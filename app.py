@@ -7,13 +7,126 @@ from src.auth import auth_page
 from src.db import (
     create_user, get_user, is_user_verified, update_reset_token, get_all_users,
     block_user, count_registered_users, verify_user_token, reset_password,
-    get_uploaded_files, save_uploaded_file, get_user_chats, save_chat
+    get_uploaded_files, save_uploaded_file, get_user_chats, save_chat,
+    count_uploaded_files, get_data_version, safe_initialize,
+    get_upload_jobs, get_file_text, get_file_pages, count_file_pages
 )
 from src.admin import show_admin_panel
-from src.helper import ai_chat_response
-from src.voice_input import get_voice_input
-from src.file_reader import extract_file
+from src.helper import ai_chat_response, build_chat_prompt
+from src.llm_client import LLMError
+from src.upload_jobs import enqueue_upload, resume_pending_jobs, has_active_jobs
 from src.translation import to_english, to_hindi
+from src.components import paginated_list, reset_pagination
+
+FILE_CONTEXT_CHARS = 4000
+PREVIEW_CHARS = 2000
+
+
+@st.cache_resource(show_spinner=False)
+def init_database():
+    safe_initialize()
+    from src.maintenance import start_scheduler
+    start_scheduler()
+    resume_pending_jobs()
+
+
+# Listing queries are cached per user and data version; save_chat and
+# save_uploaded_file bump the version, so new rows invalidate the cache.
+@st.cache_data(show_spinner=False, max_entries=256)
+def cached_file_count(user_email, data_version):
+    return count_uploaded_files(user_email)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def cached_file_page(user_email, data_version, limit):
+    return get_uploaded_files(user_email, limit=limit)
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def cached_recent_chats(user_email, data_version, limit):
+    return get_user_chats(user_email, limit=limit)
+
+
+def build_file_context(file_id, mode):
+    # Spreadsheets contribute aggregate stats or a sample instead of their full text dump.
+    from src.tabular import get_table_context
+    context = get_table_context(file_id, mode)
+    if context is None:
+        context = get_file_text(file_id, 0, FILE_CONTEXT_CHARS) or ""
+    return f"Context from uploaded file:\n{context}"
+
+
+def render_file_entry(file):
+    with st.expander(f"{file['file_name']} ({file['file_type']}) - {file['timestamp']}"):
+        st.markdown(f"**File Name:** {file['file_name']}")
+        st.markdown(f"**Type:** {file['file_type']}")
+        st.markdown(f"**Uploaded on:** {file['timestamp']}")
+
+
+def render_chat_entry(chat):
+    st.markdown(f"**🧑 You:** {chat['user']}")
+    st.markdown(f"**🤖 AI:** {chat['ai']}")
+    st.markdown("---")
+
+
+def file_preview(file_id, key, chars=PREVIEW_CHARS):
+    # Only the requested page / leading characters are read from the text store.
+    pages = count_file_pages(file_id) or 1
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+        content = (get_file_pages(file_id, page) or "")[:chars]
+    else:
+        content = get_file_text(file_id, 0, chars) or ""
+    st.text_area("Content", content, height=300, key=f"{key}_text_{page}")
+
+
+STATUS_ICONS = {"queued": "⏳", "running": "⚙️", "done": "✅", "failed": "❌"}
+
+
+# st.fragment (Streamlit >= 1.37) lets the status view poll without rerunning the whole page.
+CAN_POLL = hasattr(st, "fragment")
+
+
+def _fragment(run_every):
+    if CAN_POLL:
+        return st.fragment(run_every=run_every)
+    return lambda func: func
+
+
+def _render_upload_jobs(jobs, active):
+    with st.expander("📋 Processing Status", expanded=active):
+        for job in jobs:
+            icon = STATUS_ICONS.get(job["status"], "•")
+            line = f"{icon} `{job['file_name']}` — {job['status']}"
+            if job["error"]:
+                line += f": {job['error']}"
+            st.markdown(line)
+            if job["status"] == "done" and st.checkbox("📄 Preview", key=f"preview_job_{job['id']}"):
+                file_preview(job["file_id"], key=f"preview_{job['id']}")
+        if active and not CAN_POLL:
+            st.button("🔄 Refresh", key="refresh_uploads")
+
+
+@_fragment(run_every=2)
+def _live_upload_status(user_email):
+    jobs = get_upload_jobs(user_email, limit=10)
+    active = has_active_jobs(jobs)
+    _render_upload_jobs(jobs, active)
+    # Once the last job finishes, rerun the full page: the file list picks up the new
+    # rows and the status is rendered statically, which stops the polling.
+    if not active:
+        st.rerun()
+
+
+def upload_status_view(user_email):
+    jobs = get_upload_jobs(user_email, limit=10)
+    if not jobs:
+        return
+    if has_active_jobs(jobs):
+        _live_upload_status(user_email)
+    else:
+        _render_upload_jobs(jobs, active=False)
 
 
 def show_user_panel():
@@ -30,6 +143,10 @@ def show_user_panel():
         st.markdown(f"👋 Hi, **{user_name}**", unsafe_allow_html=True)
         if st.button("🔒 Logout"):
             del st.session_state["user"]
+            # The next user to log in on this browser session starts from a fresh view.
+            st.session_state.pop("chat_history", None)
+            reset_pagination("uploaded_files")
+            reset_pagination("chat_history")
             st.success("You have been logged out.")
             st.rerun()
 
@@ -37,79 +154,89 @@ def show_user_panel():
         language = st.selectbox("🌐 Language", ["English 🇺🇸", "Hindi🇮🇳"], index=0, disabled=True)
 
     # Upload Section
-    st.markdown("## 📁 Upload a File")
-    uploaded_file = st.file_uploader("Choose a file", type=["pdf", "txt", "xlsx", "csv"])
-    if uploaded_file:
-        progress_bar = st.progress(0, text="Uploading and extracting...")
-        file_type = uploaded_file.type
-        file_name = uploaded_file.name
-
-        try:
-            progress_bar.progress(30, "Reading file...")
-            extracted_text = extract_file(uploaded_file)
-
-            progress_bar.progress(60, "Saving to database...")
-            save_uploaded_file(user_email, file_name, file_type, extracted_text)
-
-            progress_bar.progress(100, "Done!")
-            st.success(f"✅ File `{file_name}` processed and saved.")
+    st.markdown("## 📁 Upload Files")
+    with st.form("upload_form", clear_on_submit=True):
+        uploaded_files = st.file_uploader(
+            "Choose files", type=["pdf", "txt", "xlsx", "csv"], accept_multiple_files=True
+        )
+        queued = st.form_submit_button("📤 Process files")
 
-            with st.expander("📄 Extracted Text Preview"):
-                st.text_area("Content", extracted_text[:2000], height=300)
+    if queued and uploaded_files:
+        for uploaded_file in uploaded_files:
+            enqueue_upload(user_email, uploaded_file)
+        st.success(f"✅ Queued {len(uploaded_files)} file(s) for processing.")
 
-        except Exception as e:
-            st.error(f"❌ Error: {e}")
-            progress_bar.empty()
+    upload_status_view(user_email)
 
     # Uploaded Files
     st.markdown("## 🗂️ Your Uploaded Files")
-    uploaded_files = get_uploaded_files(user_email)
-    if uploaded_files:
-        for file in uploaded_files:
-            with st.expander(f"{file['file_name']} ({file['file_type']}) - {file['timestamp']}"):
-                st.markdown(f"**File Name:** {file['file_name']}")
-                st.markdown(f"**Type:** {file['file_type']}")
-                st.markdown(f"**Uploaded on:** {file['timestamp']}")
-    else:
-        st.info("You haven't uploaded any files yet.")
+    data_version = get_data_version(user_email)
+    paginated_list(
+        "uploaded_files",
+        total=cached_file_count(user_email, data_version),
+        fetch_page=lambda limit: cached_file_page(user_email, data_version, limit),
+        render_item=render_file_entry,
+        empty_message="You haven't uploaded any files yet.",
+    )
 
     # Chat Input
+    recent_files = cached_file_page(user_email, data_version, 20)
     with st.form("chat_form"):
         manual_input = st.text_input("Type your message here:")
+        context_file = st.selectbox(
+            "📎 Use a file as context", [None] + recent_files,
+            format_func=lambda f: "None" if f is None else f"{f['file_name']} ({f['timestamp']})",
+        )
+        context_mode = st.radio("Spreadsheet context", ["stats", "sample"], horizontal=True,
+                                format_func=lambda m: {"stats": "📊 Stats", "sample": "🔎 Sampled rows"}[m])
         submitted = st.form_submit_button("Send")
 
     if submitted and manual_input.strip():
         user_input = manual_input.strip()
         translated_input = to_english(user_input) if language == "Hindi" else user_input
 
-        past_chats = get_user_chats(user_email)[-5:]
-        history = ""
-        for chat in past_chats:
-            history += f"User: {chat['user_input'][:500]}\nAI: {chat['ai_response'][:500]}\n\n"
-
-        prompt = history + f"User: {translated_input}\nAI:"
-        with st.spinner("Thinking... 🤖"):
-            response = ai_chat_response(prompt)
-
-        if language == "Hindi":
-            response = to_hindi(response)
+        past_chats = cached_recent_chats(user_email, data_version, 5)
+        context = build_file_context(context_file["id"], context_mode) if context_file else None
+        prompt = build_chat_prompt(past_chats, translated_input, context)
+        try:
+            with st.spinner("Thinking... 🤖"):
+                # Paraphrase matching only fits questions that can't refer to an earlier turn of
+                # this conversation ("summarize the above"); file context scopes the cache entry.
+                standalone = not st.session_state.get("chat_history")
+                response = ai_chat_response(
+                    prompt, semantic_key=translated_input if standalone else None, user=user_email,
+                    semantic_context=context,
+                )
+        except LLMError as e:
+            # Nothing is saved, so the failed exchange never shows up as an answer in the history.
+            st.error(f"⚠️ {e} Please try again.")
+        else:
+            if language == "Hindi":
+                response = to_hindi(response)
 
-        if "chat_history" not in st.session_state:
-            st.session_state.chat_history = []
+            if "chat_history" not in st.session_state:
+                st.session_state.chat_history = []
 
-        st.session_state.chat_history.append({"user": user_input, "ai": response})
-        save_chat(user_email, user_input, response, thread_id=None)
-        st.success(f"🤖 {response}")
+            st.session_state.chat_history.append({"user": user_input, "ai": response})
+            save_chat(user_email, user_input, response, thread_id=None)
+            st.success(f"🤖 {response}")
 
     # Chat History
     with st.expander("🕘 Conversation History", expanded=True):
-        for chat in st.session_state.get("chat_history", []):
-            st.markdown(f"**🧑 You:** {chat['user']}")
-            st.markdown(f"**🤖 AI:** {chat['ai']}")
-            st.markdown("---")
+        chat_history = st.session_state.get("chat_history", [])
+        newest_first = chat_history[::-1]
+        paginated_list(
+            "chat_history",
+            total=len(newest_first),
+            fetch_page=lambda limit: newest_first[:limit],
+            render_item=render_chat_entry,
+            page_size=10,
+        )
 
 
 def main():
+    init_database()
+
     query_params = st.query_params
     verify_token = query_params.get("verify_token")
 
@@ -0,0 +1,19 @@
+"""
+Performance benchmarks for the src/ modules.
+
+Each benchmark runs against a throwaway database and data directory (see
+benchmarks/common.py), so it never touches omnisicient.db or data/.
+Run one from the repository root, e.g.:
+
+    python -m benchmarks.pagination
+    python -m benchmarks.compression
+    python -m benchmarks.upload_jobs
+    python -m benchmarks.tabular
+    python -m benchmarks.transcription
+    python -m benchmarks.shared_cache
+    python -m benchmarks.tokens
+    python -m benchmarks.analytics [n_chats]
+    python -m benchmarks.text_store
+    python -m benchmarks.api
+    python -m benchmarks.semantic_cache [keywords|hashing|gemini] [threshold]
+"""
@@ -0,0 +1,79 @@
+"""
+Dashboard reads at ``n_chats`` chats: on-the-fly aggregation vs. the
+trigger-maintained counters, plus the per-insert cost the triggers add.
+"""
+import random
+import sys
+import time
+
+from benchmarks.common import isolated_data_dir
+from src import db
+from src.analytics import check_user_stats
+
+
+def run(n_chats=10_000_000, n_users=10_000, insert_sample=100_000):
+    rng = random.Random(0)
+    with isolated_data_dir():
+        conn = db.get_connection()
+        conn.executemany("INSERT INTO users (email, password) VALUES (?, 'x')",
+                         ((f"user{i}@example.com",) for i in range(n_users)))
+        conn.commit()
+
+        # Bulk load without triggers, then seed counters the same way a first start would.
+        triggers = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'chats'"
+        ).fetchall()
+        for name, _ in triggers:
+            conn.execute(f"DROP TRIGGER {name}")
+        start = time.perf_counter()
+        for offset in range(0, n_chats, 1_000_000):
+            conn.executemany(
+                "INSERT INTO chats (user_email, user_input, ai_response) VALUES (?, 'q', 'a')",
+                ((f"user{rng.randrange(n_users)}@example.com",) for _ in range(min(1_000_000, n_chats - offset))),
+            )
+            conn.commit()
+        load_s = time.perf_counter() - start
+        start = time.perf_counter()
+        db.rebuild_user_stats(conn.cursor())
+        conn.commit()
+        rebuild_s = time.perf_counter() - start
+
+        def timed(sql, params=(), repeats=3):
+            start = time.perf_counter()
+            for _ in range(repeats):
+                conn.execute(sql, params).fetchall()
+            return (time.perf_counter() - start) * 1000 / repeats
+
+        agg_total = timed("SELECT COUNT(*) FROM chats")
+        agg_user = timed("SELECT COUNT(*), MAX(timestamp) FROM chats WHERE user_email = ?", ("user1@example.com",))
+        agg_all = timed("SELECT user_email, COUNT(*) FROM chats GROUP BY user_email", repeats=1)
+        cnt_total = timed("SELECT value FROM app_stats WHERE name = 'total_chats'", repeats=100)
+        cnt_user = timed("SELECT * FROM user_stats WHERE email = ?", ("user1@example.com",), repeats=100)
+        cnt_all = timed("SELECT * FROM user_stats", repeats=10)
+
+        rows = [(f"user{rng.randrange(n_users)}@example.com",) for _ in range(insert_sample)]
+        start = time.perf_counter()
+        conn.executemany("INSERT INTO chats (user_email, user_input, ai_response) VALUES (?, 'q', 'a')", rows)
+        conn.commit()
+        plain_us = (time.perf_counter() - start) * 1e6 / insert_sample
+        db.rebuild_user_stats(conn.cursor())
+        conn.commit()
+        for _, sql in triggers:
+            conn.execute(sql)
+        start = time.perf_counter()
+        conn.executemany("INSERT INTO chats (user_email, user_input, ai_response) VALUES (?, 'q', 'a')", rows)
+        conn.commit()
+        trigger_us = (time.perf_counter() - start) * 1e6 / insert_sample
+        conn.close()
+        mismatches = check_user_stats()
+
+    print(f"{n_chats:,} chats across {n_users:,} users (load {load_s:.1f} s, counter seed {rebuild_s:.1f} s)")
+    print(f"  total chats:      COUNT(*) {agg_total:9.2f} ms   counter {cnt_total:7.3f} ms")
+    print(f"  one user's stats: aggregate {agg_user:8.2f} ms   counter {cnt_user:7.3f} ms")
+    print(f"  all users:        GROUP BY {agg_all:9.2f} ms   counters {cnt_all:6.3f} ms")
+    print(f"  insert cost:      {plain_us:.1f} us/row plain, {trigger_us:.1f} us/row with triggers")
+    print(f"  consistency check mismatches after benchmark inserts: {len(mismatches)}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000)
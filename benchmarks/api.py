@@ -0,0 +1,84 @@
+"""
+Serve the same "list my recent chats" interaction through the HTTP API and
+through a Streamlit rerun of app.py (via AppTest), in-process. Both run in
+an isolated data directory, so app.py's startup (database init, upload job
+resume, maintenance scheduler) never touches the real database, archive or
+backups; the scheduler's first check is minutes away and dies with the
+process.
+"""
+import asyncio
+import base64
+import hashlib
+import os
+import time
+
+from benchmarks.common import isolated_data_dir
+from src import db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _percentile(latencies, q):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+
+
+def run(requests=200, concurrency=20, chats_per_user=200):
+    import httpx
+    from streamlit.testing.v1 import AppTest
+
+    from api import app
+
+    with isolated_data_dir():
+        email, password = "bench@example.com", "bench-password"
+        conn = db.get_connection()
+        conn.execute("INSERT INTO users (email, password, name, verified) VALUES (?, ?, 'Bench', 1)",
+                     (email, hashlib.sha256(password.encode()).hexdigest()))
+        conn.executemany(
+            "INSERT INTO chats (user_email, user_input, ai_response) VALUES (?, ?, ?)",
+            [(email, f"question {i}", "answer " * 50) for i in range(chats_per_user)],
+        )
+        conn.commit()
+        conn.close()
+
+        auth = {"Authorization": "Basic " + base64.b64encode(f"{email}:{password}".encode()).decode()}
+
+        async def api_load():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                semaphore = asyncio.Semaphore(concurrency)
+                latencies = []
+
+                async def one():
+                    async with semaphore:
+                        start = time.perf_counter()
+                        response = await client.get("/chats?limit=20", headers=auth)
+                        response.raise_for_status()
+                        latencies.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                await asyncio.gather(*(one() for _ in range(requests)))
+                return time.perf_counter() - start, sorted(latencies)
+
+        api_wall, api_latencies = asyncio.run(api_load())
+
+        at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+        at.session_state["user"] = email
+        at.run()
+        st_runs = max(1, requests // 10)
+        st_latencies = []
+        start = time.perf_counter()
+        for _ in range(st_runs):
+            run_start = time.perf_counter()
+            at.run()
+            st_latencies.append(time.perf_counter() - run_start)
+        st_wall = time.perf_counter() - start
+        st_latencies.sort()
+
+    print(f"API:       {requests / api_wall:8.1f} req/s  p50 {_percentile(api_latencies, 0.5):7.1f} ms  "
+          f"p95 {_percentile(api_latencies, 0.95):7.1f} ms  ({requests} requests, concurrency {concurrency})")
+    print(f"Streamlit: {st_runs / st_wall:8.1f} req/s  p50 {_percentile(st_latencies, 0.5):7.1f} ms  "
+          f"p95 {_percentile(st_latencies, 0.95):7.1f} ms  ({st_runs} full-script reruns)")
+
+
+if __name__ == "__main__":
+    run()
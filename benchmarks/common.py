@@ -0,0 +1,69 @@
+"""
+Shared setup for benchmarks: an isolated working directory in which every
+file the app writes (database, archive, backups, spooled uploads, Parquet
+tables, text store, shared cache, audio) lands in a temporary directory.
+"""
+import importlib
+import os
+import tempfile
+from contextlib import contextmanager
+
+# (module, global, path relative to the temporary directory)
+PATH_SETTINGS = [
+    ("src.db", "DB_FILE", "bench.db"),
+    ("src.maintenance", "ARCHIVE_DB_FILE", os.path.join("data", "archive.db")),
+    ("src.maintenance", "BACKUP_DIR", os.path.join("data", "backups")),
+    ("src.upload_jobs", "SPOOL_DIR", os.path.join("data", "uploads")),
+    ("src.tabular", "TABLES_DIR", os.path.join("data", "tables")),
+    ("src.text_store", "TEXT_DIR", os.path.join("data", "texts")),
+    ("src.shared_cache", "SHARED_CACHE_FILE", os.path.join("data", "shared_cache.db")),
+    ("src.text_to_speech", "AUDIO_DIR", "temp_audio"),
+]
+
+
+def _reset_connections():
+    from src import db, shared_cache
+
+    db.close_pool()
+    shared_cache._cache = None
+
+
+@contextmanager
+def isolated_data_dir():
+    """
+    Point every data path at a fresh temporary directory (which is also made
+    the working directory) and create the tables. Everything is restored and
+    deleted on exit. Yields the directory path.
+    """
+    originals = []
+    previous_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        try:
+            _reset_connections()
+            for module_name, name, relative in PATH_SETTINGS:
+                module = importlib.import_module(module_name)
+                originals.append((module, name, getattr(module, name)))
+                setattr(module, name, os.path.join(tmp, relative))
+            os.chdir(tmp)
+
+            from src import db
+            db.create_tables()
+            yield tmp
+        finally:
+            _reset_connections()
+            os.chdir(previous_cwd)
+            for module, name, value in reversed(originals):
+                setattr(module, name, value)
+
+
+def use_database(name):
+    """
+    Switch to another database file inside the isolated directory (for
+    benchmarks that compare two storage layouts side by side).
+    """
+    from src import db
+
+    db.close_pool()
+    db.DB_FILE = os.path.join(os.getcwd(), name)
+    db.create_tables()
+    return db.DB_FILE
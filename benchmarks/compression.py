@@ -0,0 +1,51 @@
+"""
+DB size and random-read latency for raw vs compressed extracted_text.
+"""
+import os
+import random
+import time
+
+from benchmarks.common import isolated_data_dir, use_database
+from src import db
+from src.compression import COMPRESS_THRESHOLD_BYTES, pack_text
+
+
+def run(n_rows=2000, text_kb=64, reads=200):
+    words = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+    rng = random.Random(0)
+    texts = [
+        " ".join(rng.choice(words) for _ in range(text_kb * 1024 // 6))
+        for _ in range(50)
+    ]
+
+    with isolated_data_dir():
+        for label, threshold in (("raw", float("inf")), ("compressed", COMPRESS_THRESHOLD_BYTES)):
+            path = use_database(f"{label}.db")
+            conn = db.get_connection()
+            conn.executemany(
+                "INSERT INTO uploaded_files (user_email, file_name, file_type, extracted_text) VALUES (?, ?, ?, ?)",
+                [("bench@example.com", f"f{i}.txt", "text/plain",
+                  pack_text(texts[i % len(texts)], threshold)) for i in range(n_rows)],
+            )
+            conn.commit()
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.close()
+            size_mb = os.path.getsize(path) / 1024 / 1024
+
+            ids = [rng.randint(1, n_rows) for _ in range(reads)]
+            start = time.perf_counter()
+            for file_id in ids:
+                db.get_file_content(file_id)
+            read_ms = (time.perf_counter() - start) * 1000 / reads
+
+            start = time.perf_counter()
+            for _ in range(20):
+                db.get_uploaded_files("bench@example.com")
+            list_ms = (time.perf_counter() - start) * 1000 / 20
+
+            print(f"{label:>10}: {size_mb:8.1f} MB  get_file_content {read_ms:6.2f} ms  "
+                  f"get_uploaded_files {list_ms:6.2f} ms")
+
+
+if __name__ == "__main__":
+    run()
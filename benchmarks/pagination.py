@@ -0,0 +1,59 @@
+"""
+Old "render every upload" listing vs a single cached page: query time per
+rerun and the approximate payload pushed over the websocket (measured as
+the serialized markdown that each expander would carry).
+"""
+import json
+import time
+
+from benchmarks.common import isolated_data_dir
+from src import db
+from src.components import DEFAULT_PAGE_SIZE
+
+
+def run(n_files=2000, page_size=DEFAULT_PAGE_SIZE, repeats=20):
+    with isolated_data_dir():
+        email = "bench@example.com"
+        conn = db.get_connection()
+        conn.executemany(
+            "INSERT INTO uploaded_files (user_email, file_name, file_type, extracted_text) VALUES (?, ?, ?, ?)",
+            [(email, f"report_{i}.pdf", "application/pdf", "x" * 2000) for i in range(n_files)],
+        )
+        conn.commit()
+        conn.close()
+
+        def payload(files):
+            blocks = [
+                [f"{f['file_name']} ({f['file_type']}) - {f['timestamp']}",
+                 f"**File Name:** {f['file_name']}",
+                 f"**Type:** {f['file_type']}",
+                 f"**Uploaded on:** {f['timestamp']}"]
+                for f in files
+            ]
+            return len(json.dumps(blocks).encode("utf-8"))
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            full = db.get_uploaded_files(email)
+        full_ms = (time.perf_counter() - start) * 1000 / repeats
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            db.get_data_version(email)
+            page = db.get_uploaded_files(email, limit=page_size)
+        page_ms = (time.perf_counter() - start) * 1000 / repeats
+
+        # With st.cache_data keyed on the data version a warm rerun only pays the version lookup.
+        start = time.perf_counter()
+        for _ in range(repeats):
+            db.get_data_version(email)
+        cached_ms = (time.perf_counter() - start) * 1000 / repeats
+
+    print(f"{n_files} uploads, page size {page_size}")
+    print(f"  full listing:   {full_ms:7.2f} ms/rerun, payload {payload(full) / 1024:8.1f} KiB")
+    print(f"  first page:     {page_ms:7.2f} ms/rerun, payload {payload(page) / 1024:8.1f} KiB")
+    print(f"  cached page:    {cached_ms:7.2f} ms/rerun (version lookup only)")
+
+
+if __name__ == "__main__":
+    run()
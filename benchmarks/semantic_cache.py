@@ -0,0 +1,83 @@
+"""
+Threshold check for the semantic cache: cosine similarity of paraphrase
+pairs (should hit) and near-miss pairs that ask something different
+(must miss), for one embedder. A threshold is only safe if it sits above
+every near-miss score; the paraphrases it still catches are the benefit.
+
+    python -m benchmarks.semantic_cache [keywords|hashing|gemini] [threshold]
+
+Without a threshold, the embedder's own is checked.
+"""
+import sys
+import time
+
+from src.semantic_cache import GeminiEmbedder, HashingEmbedder, KeywordEmbedder, normalize_prompt
+
+PARAPHRASES = [
+    ("What is the capital of France?", "Capital city of France?"),
+    ("What is the capital of France?", "what's the capital of France"),
+    ("How do I reverse a list in Python?", "Python: how can I reverse a list?"),
+    ("Explain photosynthesis simply", "Can you give a simple explanation of photosynthesis?"),
+    ("How many days are in a leap year?", "Number of days in a leap year?"),
+    ("How do I reverse a list in Python?", "how to reverse a list in python"),
+    ("Can you explain what a black hole is?", "What's a black hole?"),
+    ("Tell me the boiling point of water", "What is the boiling point of water?"),
+    ("What are the symptoms of diabetes?", "Symptoms of diabetes"),
+    ("Please give me the population of Japan", "population of japan?"),
+]
+
+DIFFERENT = [
+    ("What was the revenue of Apple in 2021?", "What was the revenue of Apple in 2022?"),
+    ("How do I reset my password on the admin portal?", "How do I reset my password on the user portal?"),
+    ("What is the difference between TCP and UDP?", "What is the difference between TCP and IP?"),
+    ("What is the capital of France?", "What is the capital of Germany?"),
+    ("Convert 10 miles to kilometers", "Convert 10 kilometers to miles"),
+    ("How do I turn on dark mode?", "How do I turn off dark mode?"),
+    ("Who was the first president of the United States?", "Who was the second president of the United States?"),
+    ("How do I sort a list in Python?", "How do I sort a list in Java?"),
+    ("When was Google founded?", "Where was Google founded?"),
+    ("Is coffee good for you?", "Is coffee not good for you?"),
+    ("Flights from Delhi to Mumbai", "Flights from Mumbai to Delhi"),
+    ("What is 15% of 200?", "What is 20% of 150?"),
+    ("How do I delete a file in Linux?", "How do I delete a folder in Linux?"),
+    ("Why is the sky blue?", "Why is the sea blue?"),
+    # Long questions: one changed or swapped word is a small share of the features.
+    ("Cheapest train tickets from Delhi to Mumbai for tomorrow morning",
+     "Cheapest train tickets from Mumbai to Delhi for tomorrow morning"),
+    ("What was the total revenue of Apple in the fiscal year 2021 according to its annual report?",
+     "What was the total revenue of Apple in the fiscal year 2022 according to its annual report?"),
+]
+
+EMBEDDERS = {"keywords": KeywordEmbedder, "hashing": HashingEmbedder, "gemini": GeminiEmbedder}
+
+
+def _similarity(embedder, a, b):
+    return float(embedder.embed(normalize_prompt(a)) @ embedder.embed(normalize_prompt(b)))
+
+
+def run(embedder_name="keywords", threshold=None):
+    embedder = EMBEDDERS[embedder_name]()
+    threshold = embedder.threshold if threshold is None else threshold
+    start = time.perf_counter()
+    paraphrase_scores = [(_similarity(embedder, a, b), a, b) for a, b in PARAPHRASES]
+    different_scores = [(_similarity(embedder, a, b), a, b) for a, b in DIFFERENT]
+    embed_ms = (time.perf_counter() - start) * 1000 / (2 * (len(PARAPHRASES) + len(DIFFERENT)))
+
+    print(f"{embedder_name} embedder, threshold {threshold} ({embed_ms:.2f} ms per embedding)")
+    for label, scores, should_hit in (("paraphrases", paraphrase_scores, True),
+                                      ("different questions", different_scores, False)):
+        print(f"  {label}:")
+        for score, a, b in scores:
+            verdict = "hit " if score >= threshold else "miss"
+            mark = "" if (score >= threshold) == should_hit else "  <-- wrong"
+            print(f"    {score:.3f} {verdict} {a!r} vs {b!r}{mark}")
+
+    highest_wrong = max(score for score, _, _ in different_scores)
+    caught = sum(score > highest_wrong for score, _, _ in paraphrase_scores)
+    print(f"  a safe threshold must exceed {highest_wrong:.3f}; "
+          f"{caught}/{len(PARAPHRASES)} paraphrases score above that")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1] if len(sys.argv) > 1 else "keywords",
+        float(sys.argv[2]) if len(sys.argv) > 2 else None)
@@ -0,0 +1,65 @@
+"""
+Throughput of N worker processes with per-process caches vs. the shared
+cache. With per-process caches every worker recomputes every key; with the
+shared cache each key is computed roughly once across all workers.
+"""
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from src.shared_cache import SharedCache
+
+
+def _worker(args):
+    path, shared, n_ops, key_space, compute_ms, seed = args
+
+    cache = SharedCache(path) if shared else None
+    local = {}
+    rng = random.Random(seed)
+    computed = 0
+
+    def compute():
+        nonlocal computed
+        computed += 1
+        end = time.perf_counter() + compute_ms / 1000
+        while time.perf_counter() < end:  # stand-in for an LLM call / extraction
+            pass
+        return {"text": "x" * 200}
+
+    start = time.perf_counter()
+    for _ in range(n_ops):
+        key = str(rng.randrange(key_space))
+        if shared:
+            cache.get_or_compute("bench", key, compute, ttl=3600)
+        elif key not in local:
+            local[key] = compute()
+    return time.perf_counter() - start, computed
+
+
+def run(n_ops=4000, key_space=500, compute_ms=2.0):
+    cpus = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, cpus} | ({4} if cpus >= 4 else set()))
+    print(f"{n_ops} lookups/worker over {key_space} keys, {compute_ms} ms per miss, {cpus} CPUs")
+
+    ctx = multiprocessing.get_context("spawn")
+    for workers in worker_counts:
+        for shared in (False, True):
+            # Each run gets its own cache file; the app's data/shared_cache.db is never opened.
+            with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+                path = os.path.join(tmp, "cache.db")
+                SharedCache(path)._connection()
+                args = [(path, shared, n_ops, key_space, compute_ms, seed) for seed in range(workers)]
+                start = time.perf_counter()
+                with ctx.Pool(workers) as pool:
+                    results = pool.map(_worker, args)
+                wall = time.perf_counter() - start
+            computed = sum(c for _, c in results)
+            label = "shared cache" if shared else "per-process"
+            print(f"  {workers:2d} workers, {label:12}: {workers * n_ops / wall:9.0f} lookups/s, "
+                  f"{computed:5d} computations")
+
+
+if __name__ == "__main__":
+    run()
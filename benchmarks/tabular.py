@@ -0,0 +1,68 @@
+"""
+Ingest a generated multi-million-row CSV and compare with the old "load
+everything and to_string()" approach (on a 100k-row slice, since the full
+dump doesn't fit comfortably in memory).
+"""
+import os
+import resource
+import time
+
+from benchmarks.common import isolated_data_dir
+from src.tabular import get_table_context, ingest_tables, register_file_tables
+
+
+class _Upload:
+    def __init__(self, path):
+        self.name = os.path.basename(path)
+        self.type = "text/csv"
+        self._path = path
+
+    def __fspath__(self):
+        return self._path
+
+
+def run(n_rows=2_000_000):
+    import numpy as np
+    import pandas as pd
+
+    with isolated_data_dir() as tmp:
+        csv_path = os.path.join(tmp, "big.csv")
+
+        rng = np.random.default_rng(0)
+        for start in range(0, n_rows, 500_000):
+            size = min(500_000, n_rows - start)
+            pd.DataFrame({
+                "id": np.arange(start, start + size),
+                "amount": rng.normal(100, 25, size).round(2),
+                "category": rng.choice(["alpha", "beta", "gamma", "delta"], size),
+                "flag": rng.integers(0, 2, size).astype(bool),
+            }).to_csv(csv_path, mode="a", header=start == 0, index=False)
+        csv_mb = os.path.getsize(csv_path) / 1024 / 1024
+
+        start = time.perf_counter()
+        tables = ingest_tables(_Upload(csv_path))
+        tables = register_file_tables(1, tables)
+        ingest_s = time.perf_counter() - start
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        parquet_mb = os.path.getsize(tables[0]["path"]) / 1024 / 1024
+
+        start = time.perf_counter()
+        stats_text = get_table_context(1, "stats")
+        stats_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        sample_text = get_table_context(1, "sample")
+        sample_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        dump = pd.read_csv(csv_path, nrows=100_000).to_string(index=False)
+        dump_s = time.perf_counter() - start
+
+    print(f"{n_rows:,} rows, CSV {csv_mb:.1f} MB -> Parquet {parquet_mb:.1f} MB")
+    print(f"  chunked ingest: {ingest_s:.2f} s, peak RSS {peak_mb:.0f} MB")
+    print(f"  stats context:  {stats_ms:.1f} ms, {len(stats_text):,} chars")
+    print(f"  sample context: {sample_ms:.1f} ms, {len(sample_text):,} chars")
+    print(f"  old to_string dump of 100k rows: {dump_s:.2f} s, {len(dump):,} chars")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,74 @@
+"""
+Memory and latency of preview / page / chunk reads: the inline TEXT column
+(the whole value is loaded, then sliced) vs the mmap'd text store.
+"""
+import random
+import time
+import tracemalloc
+
+from benchmarks.common import isolated_data_dir, use_database
+from src import db
+from src.text_store import PAGE_BREAK, commit_text_file, index_text, write_text
+
+
+def run(n_docs=20, pages_per_doc=1500, page_chars=3000, reads=200):
+    rng = random.Random(0)
+    words = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor".split()
+
+    def page_text():
+        return " ".join(rng.choice(words) for _ in range(page_chars // 6))
+
+    pages = [page_text() for _ in range(50)]
+    docs = [PAGE_BREAK.join(pages[(d + p) % len(pages)] for p in range(pages_per_doc)) for d in range(n_docs)]
+    doc_mb = sum(len(doc) for doc in docs) / n_docs / 1024 / 1024
+
+    reads_by_kind = {
+        "preview 2000 chars": lambda file_id: db.get_file_text(file_id, 0, 2000),
+        "one page": lambda file_id: db.get_file_pages(file_id, rng.randint(1, pages_per_doc)),
+        "4000-char chunk": lambda file_id: db.get_file_text(
+            file_id, rng.randint(0, len(docs[0]) - 4000), 4000),
+    }
+
+    results = {}
+    with isolated_data_dir():
+        for label in ("inline", "mmap"):
+            use_database(f"{label}.db")
+            conn = db.get_connection()
+            cursor = conn.cursor()
+            paths = []
+            staged = [write_text(doc) for doc in docs] if label == "mmap" else []
+            for i, doc in enumerate(docs):
+                cursor.execute(
+                    "INSERT INTO uploaded_files (user_email, file_name, file_type, extracted_text) VALUES (?, ?, ?, ?)",
+                    ("bench@example.com", f"doc{i}.pdf", "application/pdf", doc if label == "inline" else None),
+                )
+                if label == "mmap":
+                    index_text(cursor, cursor.lastrowid, staged[i])
+                    paths.append(staged[i]["path"])
+            conn.commit()
+            conn.close()
+            for path in paths:
+                commit_text_file(path)
+
+            for kind, read in reads_by_kind.items():
+                ids = [rng.randint(1, n_docs) for _ in range(reads)]
+                start = time.perf_counter()
+                for file_id in ids:
+                    read(file_id)
+                latency_ms = (time.perf_counter() - start) * 1000 / reads
+
+                tracemalloc.start()
+                read(ids[0])
+                peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+                tracemalloc.stop()
+                results[kind, label] = (latency_ms, peak_kb)
+
+    print(f"{n_docs} documents of {pages_per_doc} pages (~{doc_mb:.1f} MB each)")
+    for kind in reads_by_kind:
+        for label in ("inline", "mmap"):
+            latency_ms, peak_kb = results[kind, label]
+            print(f"  {kind:<20} {label:>6}: {latency_ms:8.3f} ms/read  peak {peak_kb:10.1f} KB")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,61 @@
+"""
+Token checks with n_tokens outstanding: the old inline users.verification_token
+scan vs. the indexed auth_tokens point query, plus one expiry sweep.
+"""
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks.common import isolated_data_dir
+from src import db
+
+
+def run(n_tokens=1_000_000, lookups=2000):
+    rng = random.Random(0)
+    tokens = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(n_tokens)]
+    now = int(time.time())
+    expiry_str = (datetime.now() + timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S")
+
+    with isolated_data_dir():
+        conn = db.get_connection()
+        conn.executemany(
+            "INSERT INTO users (email, password, verification_token, verification_token_expiry) VALUES (?, 'x', ?, ?)",
+            ((f"user{i}@example.com", token, expiry_str) for i, token in enumerate(tokens)),
+        )
+        conn.executemany(
+            "INSERT INTO auth_tokens (token_hash, email, purpose, expires_at) VALUES (?, ?, 'verify', ?)",
+            ((db._hash_token(token), f"user{i}@example.com", now + rng.randint(-3600, 3600))
+             for i, token in enumerate(tokens)),
+        )
+        conn.commit()
+        sample = [rng.choice(tokens) for _ in range(lookups)]
+
+        legacy_n = max(1, lookups // 100)
+        start = time.perf_counter()
+        for token in sample[:legacy_n]:
+            row = conn.execute(
+                "SELECT email, verification_token_expiry FROM users WHERE verification_token = ?", (token,)
+            ).fetchone()
+            datetime.strptime(row["verification_token_expiry"], "%Y-%m-%d %H:%M:%S") > datetime.now()
+        legacy_ms = (time.perf_counter() - start) * 1000 / legacy_n
+
+        cursor = conn.cursor()
+        start = time.perf_counter()
+        for token in sample:
+            db._lookup_token(cursor, token, "verify")
+        indexed_ms = (time.perf_counter() - start) * 1000 / lookups
+        conn.close()
+
+        start = time.perf_counter()
+        swept = db.purge_expired_tokens()
+        sweep_s = time.perf_counter() - start
+
+    print(f"{n_tokens:,} outstanding tokens")
+    print(f"  inline users scan:        {legacy_ms:9.3f} ms/lookup")
+    print(f"  auth_tokens point query:  {indexed_ms:9.3f} ms/lookup")
+    print(f"  sweeper removed {swept:,} expired tokens in {sweep_s:.2f} s")
+
+
+if __name__ == "__main__":
+    run()
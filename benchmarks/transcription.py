@@ -0,0 +1,38 @@
+"""
+Wall time vs. audio length for serial vs. parallel chunk transcription,
+using the stub backend with simulated API latency.
+"""
+import io
+import time
+
+from benchmarks.common import isolated_data_dir
+from src.transcription import SAMPLE_RATE, TRANSCRIPTION_WORKERS, StubBackend, transcribe_audio
+
+
+def run(minutes=(1, 5, 10, 20), realtime_factor=0.05):
+    from pydub import AudioSegment
+    from pydub.generators import Sine
+
+    backend = StubBackend(realtime_factor=realtime_factor, fixed_latency=0.3)
+    # 20 s of tone followed by 1 s of silence, like speech with pauses.
+    phrase = Sine(440).to_audio_segment(duration=20_000, volume=-10) + AudioSegment.silent(1_000)
+
+    print(f"stub backend: 0.3 s + {realtime_factor:.2f} x audio length per request")
+    with isolated_data_dir():
+        for length in minutes:
+            audio = phrase * int(length * 60 / 21 + 1)
+            buffer = io.BytesIO()
+            audio.set_frame_rate(SAMPLE_RATE).set_channels(1).export(buffer, format="wav")
+            data = buffer.getvalue()
+
+            timings = {}
+            for workers in (1, TRANSCRIPTION_WORKERS):
+                start = time.perf_counter()
+                transcribe_audio(data, ".wav", backend=backend, max_workers=workers, use_cache=False)
+                timings[workers] = time.perf_counter() - start
+            print(f"  {length:3d} min: serial {timings[1]:6.2f} s, "
+                  f"{TRANSCRIPTION_WORKERS} workers {timings[TRANSCRIPTION_WORKERS]:6.2f} s")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,58 @@
+"""
+Extraction throughput for a batch of files: serial path vs. the job queue.
+Uses small generated PDFs when PyMuPDF is installed, plain text otherwise.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import isolated_data_dir
+from src import upload_jobs
+from src.db import get_upload_jobs, save_uploaded_file
+from src.file_reader import extract_file
+from src.upload_jobs import UPLOAD_WORKERS, SpooledUpload, enqueue_upload
+
+
+def _sample():
+    try:
+        import fitz
+    except ImportError:
+        return ("benchmark text\n" * 20000).encode("utf-8"), "text/plain"
+    doc = fitz.open()
+    for page_no in range(20):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {page_no} " + "benchmark text " * 40)
+    return doc.tobytes(), "application/pdf"
+
+
+def run(n_files=100, workers=UPLOAD_WORKERS):
+    sample, sample_type = _sample()
+
+    with isolated_data_dir():
+        start = time.perf_counter()
+        for i in range(n_files):
+            text = extract_file(SpooledUpload(sample, f"serial_{i}", sample_type))
+            save_uploaded_file("bench@example.com", f"serial_{i}", sample_type, text)
+        serial_s = time.perf_counter() - start
+
+        previous_executor = upload_jobs._executor
+        upload_jobs._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload")
+        try:
+            start = time.perf_counter()
+            for i in range(n_files):
+                enqueue_upload("bench@example.com", SpooledUpload(sample, f"queued_{i}", sample_type))
+            enqueue_s = time.perf_counter() - start
+            upload_jobs._executor.shutdown(wait=True)
+            queued_s = time.perf_counter() - start
+        finally:
+            upload_jobs._executor = previous_executor
+
+        done = len(get_upload_jobs(status="done"))
+
+    print(f"{n_files} x {sample_type} ({len(sample) / 1024:.0f} KiB each)")
+    print(f"  serial:               {serial_s:6.2f} s  ({n_files / serial_s:6.1f} files/s)")
+    print(f"  job queue ({workers} workers): {queued_s:6.2f} s  ({n_files / queued_s:6.1f} files/s), "
+          f"UI blocked for {enqueue_s * 1000:.0f} ms, {done}/{n_files} done")
+
+
+if __name__ == "__main__":
+    run()
@@ -2,6 +2,7 @@ import streamlit as st
 from src.voice_input import get_voice_input
 from src.translation import to_english, to_hindi
 from src.helper import ai_chat_response
+from src.llm_client import LLMError
 
 # Optional: user preference stored in session
 language = st.selectbox("🌐 Language", ["English", "Hindi"])
@@ -26,7 +27,11 @@ if text_input:
     query = to_english(text_input, src_lang="hi") if language == "Hindi" else text_input
 
     # Replace with your chatbot logic
-    ai_response = ai_chat_response(query)
+    try:
+        ai_response = ai_chat_response(query)
+    except LLMError as e:
+        st.error(f"⚠️ {e}")
+        st.stop()
 
     # Translate back to Hindi if needed
     if language == "Hindi":
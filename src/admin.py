@@ -1,24 +1,46 @@
 import streamlit as st
 from src.db import (
     get_all_users, block_user, export_chats_to_csv,
-    count_registered_users
+    get_user_stats
 )
+from src.analytics import get_totals
 from src.email_utils import send_email
+from src.semantic_cache import get_semantic_cache
 
 
 def show_admin_panel():
     st.set_page_config(page_title="Admin Dashboard", page_icon="👑")
     st.title("👑 OMNISCENT Admin Dashboard")
 
-    # --- Metrics Section
-    col1, col2 = st.columns(2)
+    # --- Metrics Section (O(1) counters maintained by DB triggers)
+    totals = get_totals()
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
-        total_users = count_registered_users()
-        st.metric("Total Registered Users", total_users)
+        st.metric("Total Registered Users", totals["registered_users"])
 
     with col2:
+        st.metric("Chats Sent", totals["total_chats"])
+
+    with col3:
+        st.metric("Files Uploaded", totals["total_files"])
+
+    with col4:
         st.metric("Admin Access", "✔️ Active")
 
+    # --- Semantic prompt cache (this app process, only when an embedder is configured)
+    semantic_cache = get_semantic_cache()
+    if semantic_cache is not None:
+        cache_stats = semantic_cache.stats()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Prompt Cache Hit Rate", f"{cache_stats['hit_rate']:.0%}",
+                      help=f"{cache_stats['hits']} of {cache_stats['lookups']} lookups")
+        with col2:
+            st.metric("Gemini Time Saved", f"{cache_stats['latency_saved_s']:.1f} s")
+        with col3:
+            st.metric("Cached Prompts", cache_stats["entries"],
+                      help=f"{cache_stats['avg_lookup_ms']:.2f} ms per lookup")
+
     st.markdown("---")
 
     # --- Search & Filter Users
@@ -26,6 +48,7 @@ def show_admin_panel():
     search_term = st.text_input("🔍 Search user by email or name")
 
     users = get_all_users()
+    user_stats = get_user_stats()
     users = sorted(users, key=lambda u: u.get("blocked", 0), reverse=True)
 
     if search_term:
@@ -47,6 +70,12 @@ def show_admin_panel():
                     🧑‍💼 *{user.get("profession", "Unknown")}*  
                     🛡️ Role: `{user.get("role", "user")}`
                 """)
+                stats = user_stats.get(user["email"])
+                if stats:
+                    st.caption(
+                        f"💬 {stats['chats_sent']} chats · 📁 {stats['files_uploaded']} files · "
+                        f"🕒 last active {stats['last_active'] or 'never'}"
+                    )
             with col2:
                 blocked = bool(user.get("blocked", 0))
                 btn_label = "🔓 Unblock" if blocked else "🔒 Block"
@@ -0,0 +1,94 @@
+"""
+Dashboard numbers, read from the trigger-maintained user_stats/app_stats
+counters (see src/db.py) rather than aggregated on every rerun.
+"""
+import sys
+
+from src import db
+
+
+def get_totals():
+    return {
+        "registered_users": db.get_app_stat("registered_users"),
+        "total_chats": db.get_app_stat("total_chats"),
+        "total_files": db.get_app_stat("total_files"),
+    }
+
+
+def _find_mismatches(cursor):
+    """
+    Compare the counters with a full recount (live rows + archived rows), all
+    read through ``cursor`` inside the caller's transaction. Returns the
+    mismatches and the archived counts the recount used.
+    """
+    from src.maintenance import count_archived_by_user
+
+    # Live tables are read first, which fixes the main snapshot. An archive batch writes the
+    # archive before deleting live rows, so a row gone from this snapshot is already in the
+    # archive; rows in both are dropped by count_archived_by_user.
+    expected = {}
+    for row in cursor.execute("SELECT user_email, COUNT(*) FROM chats WHERE user_email IS NOT NULL GROUP BY user_email"):
+        expected.setdefault(row[0], [0, 0])[0] += row[1]
+    for row in cursor.execute(
+        "SELECT user_email, COUNT(*) FROM uploaded_files WHERE user_email IS NOT NULL GROUP BY user_email"
+    ):
+        expected.setdefault(row[0], [0, 0])[1] += row[1]
+    archived = count_archived_by_user(cursor)
+    for (table, email), count in archived.items():
+        if table == "chats":
+            expected.setdefault(email, [0, 0])[0] += count
+        elif table == "uploaded_files":
+            expected.setdefault(email, [0, 0])[1] += count
+
+    actual = {
+        row["email"]: [row["chats_sent"], row["files_uploaded"]]
+        for row in cursor.execute("SELECT email, chats_sent, files_uploaded FROM user_stats")
+    }
+    mismatches = [
+        {"email": email, "expected": expected.get(email, [0, 0]), "actual": actual.get(email, [0, 0])}
+        for email in set(expected) | set(actual)
+        if expected.get(email, [0, 0]) != actual.get(email, [0, 0])
+    ]
+
+    registered = cursor.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    row = cursor.execute("SELECT value FROM app_stats WHERE name = 'registered_users'").fetchone()
+    counted = row[0] if row else 0
+    if registered != counted:
+        mismatches.append({"email": None, "expected": registered, "actual": counted})
+    return mismatches, archived
+
+
+def check_user_stats(repair=False):
+    """
+    Compare the counters with a full recount. Returns the list of mismatches;
+    with ``repair=True`` the counters are rebuilt when anything is off.
+
+    The check runs in one read transaction with the archive attached, so the
+    counters and the rows they count come from the same snapshot and writers
+    aren't blocked. A repair recounts under the write lock, so no insert can
+    land between the recount and the rebuild.
+    """
+    from src.maintenance import attach_archive, detach_archive
+
+    conn = db.get_connection()
+    attach_archive(conn)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN")
+        mismatches, _ = _find_mismatches(cursor)
+        conn.rollback()
+        if mismatches and repair:
+            cursor.execute("BEGIN IMMEDIATE")
+            mismatches, archived = _find_mismatches(cursor)
+            if mismatches:
+                db.rebuild_user_stats(cursor, archived)
+            conn.commit()
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        detach_archive(conn)
+        conn.close()
+    return mismatches
+
+if __name__ == "__main__":
+    print(f"Mismatches: {check_user_stats(repair='--repair' in sys.argv)}")
@@ -0,0 +1,39 @@
+import streamlit as st
+
+
+DEFAULT_PAGE_SIZE = 20
+
+
+def paginated_list(key, total, fetch_page, render_item, page_size=DEFAULT_PAGE_SIZE, empty_message=None):
+    """
+    Render only the first N items of a long list, with a "Load more" button.
+
+    ``fetch_page(limit)`` must return the first ``limit`` items (callers are
+    expected to back it with a cached query), and ``render_item(item)`` draws a
+    single entry. The number of visible items is kept in session state under
+    ``key`` so it survives reruns, and nothing past that window is sent to the
+    browser.
+    """
+    if total == 0:
+        if empty_message:
+            st.info(empty_message)
+        return
+
+    state_key = f"{key}_visible"
+    visible = min(st.session_state.get(state_key, page_size), total)
+
+    for item in fetch_page(visible):
+        render_item(item)
+
+    if visible < total:
+        remaining = total - visible
+        label = f"⬇️ Load more ({remaining} remaining)"
+        if st.button(label, key=f"{key}_load_more"):
+            st.session_state[state_key] = visible + page_size
+            st.rerun()
+    else:
+        st.caption(f"Showing all {total} items.")
+
+
+def reset_pagination(key):
+    st.session_state.pop(f"{key}_visible", None)
@@ -0,0 +1,63 @@
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, zlib is always available
+    zstandard = None
+
+
+# Every compressed payload starts with a short codec marker so readers never
+# have to guess how a value was written, even if the preferred codec changes.
+ZSTD_MARKER = b"zs1:"
+ZLIB_MARKER = b"zl1:"
+
+
+def compress_bytes(data, level=None):
+    """
+    Compress ``data`` with zstd when available, otherwise zlib, and prefix the codec marker.
+    """
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=level or 10)
+        return ZSTD_MARKER + compressor.compress(data)
+    return ZLIB_MARKER + zlib.compress(data, level or 6)
+
+
+def decompress_bytes(blob):
+    blob = bytes(blob)
+    if blob.startswith(ZLIB_MARKER):
+        return zlib.decompress(blob[len(ZLIB_MARKER):])
+    if blob.startswith(ZSTD_MARKER):
+        if zstandard is None:
+            raise RuntimeError("Value is zstd-compressed but the 'zstandard' package is not installed.")
+        return zstandard.ZstdDecompressor().decompress(blob[len(ZSTD_MARKER):])
+    raise ValueError("Unknown compression marker")
+
+
+# === Text payloads stored in the DB ===
+
+# Values shorter than this are stored as plain TEXT; compressing them isn't worth the CPU.
+COMPRESS_THRESHOLD_BYTES = int(os.environ.get("COMPRESS_THRESHOLD_BYTES", 4096))
+
+
+def pack_text(text, threshold=None):
+    """
+    Return ``text`` unchanged if it is small, otherwise a compressed BLOB.
+
+    SQLite keeps the BLOB type even in a TEXT column, so readers can tell the
+    two apart by type alone and ``unpack_text`` stays transparent.
+    """
+    if text is None or not isinstance(text, str):
+        return text
+    threshold = COMPRESS_THRESHOLD_BYTES if threshold is None else threshold
+    raw = text.encode("utf-8")
+    if len(raw) < threshold:
+        return text
+    packed = compress_bytes(raw)
+    return packed if len(packed) < len(raw) else text
+
+
+def unpack_text(value):
+    if isinstance(value, (bytes, memoryview)):
+        return decompress_bytes(value).decode("utf-8")
+    return value
@@ -1,21 +1,77 @@
 import os
 import sys
+import queue
 import sqlite3
-from datetime import datetime, timedelta
-import pandas as pd
+import threading
+from datetime import datetime
 import hashlib
+import time
+
+from src.compression import pack_text, unpack_text, COMPRESS_THRESHOLD_BYTES
+from src import text_store
+from src.shared_cache import get_cache
 
 DB_FILE = "omnisicient.db"
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 8))
+
+# === Connection Pool ===
+# Every helper below opens a connection and closes it when done. Pooled
+# connections are handed back on close() instead of being torn down, so
+# busy callers (reruns, API requests, background jobs) skip the connect cost.
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+class PooledConnection(sqlite3.Connection):
+    pool_key = None
+
+    def close(self):
+        pool = _pools.get(self.pool_key)
+        if pool is not None and pool.qsize() < DB_POOL_SIZE:
+            if self.in_transaction:
+                self.rollback()
+            pool.put(self)
+        else:
+            super().close()
+
+def _get_pool():
+    # Keyed by process too: a connection must never be reused across a fork.
+    key = (DB_FILE, os.getpid())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = queue.LifoQueue()
+        return key, _pools[key]
+
+def close_pool():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        while not pool.empty():
+            sqlite3.Connection.close(pool.get_nowait())
 
 def get_connection():
-    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+    key, pool = _get_pool()
+    try:
+        return pool.get_nowait()
+    except queue.Empty:
+        pass
+    conn = sqlite3.connect(DB_FILE, check_same_thread=False, timeout=30, factory=PooledConnection)
     conn.row_factory = sqlite3.Row
+    conn.pool_key = key
     return conn
 
 def create_tables():
     conn = get_connection()
     cursor = conn.cursor()
 
+    # Only takes effect on a new, empty database (so it must come before the WAL switch);
+    # existing ones are converted offline with `python -m src.maintenance enable-incremental-vacuum`.
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
+    # WAL lets readers and the background maintenance jobs run alongside writers
+    cursor.execute("PRAGMA journal_mode=WAL")
+
     # ✅ Users table (fixed missing field)
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS users (
@@ -70,9 +126,319 @@ def create_tables():
     )
     """)
 
+    # ✅ Verification / password-reset tokens (hashed, integer expiry)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS auth_tokens (
+        token_hash TEXT PRIMARY KEY,
+        email TEXT NOT NULL,
+        purpose TEXT NOT NULL,
+        expires_at INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_auth_tokens_expiry ON auth_tokens (expires_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_auth_tokens_email ON auth_tokens (email, purpose)")
+
+    # ✅ Per-user data version, bumped on every write that changes what the user panel lists
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS data_versions (
+        user_email TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+
+    # ✅ Last run of each background maintenance job (see src/maintenance.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS maintenance_state (
+        job TEXT PRIMARY KEY,
+        last_run INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+
+    # ✅ Background upload jobs (see src/upload_jobs.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS upload_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_email TEXT,
+        file_name TEXT,
+        file_type TEXT,
+        spool_path TEXT,
+        status TEXT NOT NULL DEFAULT 'queued',
+        error TEXT,
+        file_id INTEGER,
+        claimed_by TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_email) REFERENCES users(email)
+    )
+    """)
+
+    # ✅ Parquet tables extracted from CSV/XLSX uploads (see src/tabular.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS file_tables (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        file_id INTEGER NOT NULL,
+        sheet_name TEXT,
+        path TEXT NOT NULL,
+        n_rows INTEGER,
+        stats_json TEXT,
+        FOREIGN KEY (file_id) REFERENCES uploaded_files(id)
+    )
+    """)
+
+    # ✅ Transcripts keyed by audio content hash (see src/transcription.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS transcription_cache (
+        audio_hash TEXT NOT NULL,
+        backend TEXT NOT NULL,
+        text TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (audio_hash, backend)
+    )
+    """)
+
+    # ✅ Extracted text stored as files, with a page/offset index (see src/text_store.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS file_texts (
+        file_id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL,
+        n_chars INTEGER NOT NULL,
+        n_bytes INTEGER NOT NULL,
+        n_pages INTEGER NOT NULL,
+        FOREIGN KEY (file_id) REFERENCES uploaded_files(id)
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS file_text_index (
+        file_id INTEGER NOT NULL,
+        char_start INTEGER NOT NULL,
+        page INTEGER NOT NULL,
+        byte_start INTEGER NOT NULL,
+        PRIMARY KEY (file_id, char_start)
+    ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_text_index_page ON file_text_index (file_id, page)")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_tables_file ON file_tables (file_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_upload_jobs_user ON upload_jobs (user_email, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_upload_jobs_status ON upload_jobs (status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_chats_user_ts ON chats (user_email, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_files_user_ts ON uploaded_files (user_email, timestamp)")
+
+    _create_stats_tables(cursor)
+
     conn.commit()
     conn.close()
 
+# === Activity Counters ===
+# user_stats / app_stats are kept up to date by triggers on users, chats and
+# uploaded_files, so dashboards read O(1) counters instead of aggregating.
+# Counters are lifetime totals: archiving old rows (src/maintenance.py) does
+# not decrement them. src/analytics.py checks and repairs them periodically.
+
+def _create_stats_tables(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS user_stats (
+        email TEXT PRIMARY KEY,
+        chats_sent INTEGER NOT NULL DEFAULT 0,
+        files_uploaded INTEGER NOT NULL DEFAULT 0,
+        last_active DATETIME
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS app_stats (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_users_insert_stats AFTER INSERT ON users
+    BEGIN
+        INSERT OR IGNORE INTO user_stats (email) VALUES (NEW.email);
+        UPDATE app_stats SET value = value + 1 WHERE name = 'registered_users';
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_users_delete_stats AFTER DELETE ON users
+    BEGIN
+        UPDATE app_stats SET value = value - 1 WHERE name = 'registered_users';
+    END
+    """)
+
+    # Earlier versions of these two triggers upserted NULL emails, which never conflict and so
+    # added a user_stats row per insert; replace them and drop the rows they left.
+    stale = False
+    for name in ("trg_chats_insert_stats", "trg_files_insert_stats"):
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,))
+        row = cursor.fetchone()
+        if row and "user_email IS NOT NULL" not in row[0]:
+            cursor.execute(f"DROP TRIGGER {name}")
+            stale = True
+    if stale:
+        cursor.execute("DELETE FROM user_stats WHERE email IS NULL")
+
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_chats_insert_stats AFTER INSERT ON chats
+    BEGIN
+        INSERT INTO user_stats (email, chats_sent, last_active)
+        SELECT NEW.user_email, 1, NEW.timestamp WHERE NEW.user_email IS NOT NULL
+        ON CONFLICT (email) DO UPDATE SET
+            chats_sent = chats_sent + 1,
+            last_active = max(coalesce(last_active, ''), excluded.last_active);
+        UPDATE app_stats SET value = value + 1 WHERE name = 'total_chats';
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_files_insert_stats AFTER INSERT ON uploaded_files
+    BEGIN
+        INSERT INTO user_stats (email, files_uploaded, last_active)
+        SELECT NEW.user_email, 1, NEW.timestamp WHERE NEW.user_email IS NOT NULL
+        ON CONFLICT (email) DO UPDATE SET
+            files_uploaded = files_uploaded + 1,
+            last_active = max(coalesce(last_active, ''), excluded.last_active);
+        UPDATE app_stats SET value = value + 1 WHERE name = 'total_files';
+    END
+    """)
+
+    # First run on an existing database: seed the counters from the live tables.
+    cursor.execute("SELECT 1 FROM app_stats WHERE name = 'registered_users'")
+    if cursor.fetchone() is None:
+        rebuild_user_stats(cursor)
+
+def rebuild_user_stats(cursor, archived=None):
+    """
+    Recompute every counter from the live tables, plus ``archived`` counts
+    ({(table, email): n}) for rows that have been moved to the archive.
+    """
+    archived = archived or {}
+    cursor.execute("DELETE FROM user_stats")
+    cursor.execute("INSERT INTO user_stats (email) SELECT email FROM users")
+    cursor.execute("""
+        INSERT INTO user_stats (email, chats_sent, last_active)
+        SELECT user_email, COUNT(*), MAX(timestamp) FROM chats WHERE user_email IS NOT NULL GROUP BY user_email
+        ON CONFLICT (email) DO UPDATE SET chats_sent = excluded.chats_sent, last_active = excluded.last_active
+    """)
+    cursor.execute("""
+        INSERT INTO user_stats (email, files_uploaded, last_active)
+        SELECT user_email, COUNT(*), MAX(timestamp) FROM uploaded_files WHERE user_email IS NOT NULL
+        GROUP BY user_email
+        ON CONFLICT (email) DO UPDATE SET
+            files_uploaded = excluded.files_uploaded,
+            last_active = max(coalesce(last_active, ''), excluded.last_active)
+    """)
+    column = {"chats": "chats_sent", "uploaded_files": "files_uploaded"}
+    for (table, email), count in archived.items():
+        if table in column:
+            cursor.execute(f"""
+                INSERT INTO user_stats (email, {column[table]}) VALUES (?, ?)
+                ON CONFLICT (email) DO UPDATE SET {column[table]} = {column[table]} + excluded.{column[table]}
+            """, (email, count))
+
+    cursor.execute("""
+        INSERT OR REPLACE INTO app_stats (name, value) VALUES
+            ('registered_users', (SELECT COUNT(*) FROM users)),
+            ('total_chats', (SELECT COALESCE(SUM(chats_sent), 0) FROM user_stats)),
+            ('total_files', (SELECT COALESCE(SUM(files_uploaded), 0) FROM user_stats))
+    """)
+
+def get_app_stat(name):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT value FROM app_stats WHERE name = ?", (name,))
+    row = cursor.fetchone()
+    conn.close()
+    return row["value"] if row else 0
+
+def get_user_stats(email=None):
+    """
+    Counters for one user (dict or None), or for everyone as {email: dict}.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    if email is not None:
+        cursor.execute("SELECT * FROM user_stats WHERE email = ?", (email,))
+        row = cursor.fetchone()
+        conn.close()
+        return dict(row) if row else None
+    cursor.execute("SELECT * FROM user_stats")
+    rows = cursor.fetchall()
+    conn.close()
+    return {row["email"]: dict(row) for row in rows}
+
+# === Auth Tokens ===
+# Verification and reset tokens live in auth_tokens, stored as SHA-256 hashes
+# with integer expiry epochs, so checking one is a single primary-key lookup.
+
+VERIFY_TOKEN_TTL = 60 * 60
+TOKEN_SWEEP_BATCH = 5000
+
+def _hash_token(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _issue_token(cursor, email, purpose, token, expires_at):
+    cursor.execute("""
+        INSERT OR REPLACE INTO auth_tokens (token_hash, email, purpose, expires_at)
+        VALUES (?, ?, ?, ?)
+    """, (_hash_token(token), email, purpose, expires_at))
+
+def _lookup_token(cursor, token, purpose):
+    if not token:
+        return None
+    cursor.execute("""
+        SELECT email FROM auth_tokens
+        WHERE token_hash = ? AND purpose = ? AND expires_at > ?
+    """, (_hash_token(token), purpose, int(time.time())))
+    row = cursor.fetchone()
+    return row["email"] if row else None
+
+def purge_expired_tokens(batch_size=TOKEN_SWEEP_BATCH):
+    """
+    Delete expired tokens in batches (uses the expires_at index). Run by the maintenance scheduler.
+    """
+    conn = get_connection()
+    removed = 0
+    while True:
+        cur = conn.execute("""
+            DELETE FROM auth_tokens WHERE token_hash IN (
+                SELECT token_hash FROM auth_tokens WHERE expires_at <= ? LIMIT ?
+            )
+        """, (int(time.time()), batch_size))
+        conn.commit()
+        removed += cur.rowcount
+        if cur.rowcount < batch_size:
+            break
+    conn.close()
+    return removed
+
+def migrate_legacy_tokens():
+    """
+    Move tokens still stored inline on users into auth_tokens and clear the old columns.
+    """
+    conn = get_connection()
+    rows = conn.execute("""
+        SELECT email, verification_token, verification_token_expiry, reset_token, reset_token_expiry
+        FROM users WHERE verification_token IS NOT NULL OR reset_token IS NOT NULL
+    """).fetchall()
+    for row in rows:
+        for purpose, token, expiry in (("verify", row["verification_token"], row["verification_token_expiry"]),
+                                       ("reset", row["reset_token"], row["reset_token_expiry"])):
+            if not token:
+                continue
+            try:
+                expires_at = int(datetime.strptime(str(expiry), "%Y-%m-%d %H:%M:%S").timestamp())
+            except ValueError:
+                expires_at = int(time.time()) + VERIFY_TOKEN_TTL if purpose == "verify" else 0
+            _issue_token(conn, row["email"], purpose, token, expires_at)
+    conn.execute("""
+        UPDATE users SET verification_token = NULL, verification_token_expiry = NULL,
+                         reset_token = NULL, reset_token_expiry = NULL
+        WHERE verification_token IS NOT NULL OR reset_token IS NOT NULL
+    """)
+    conn.commit()
+    conn.close()
+    return len(rows)
+
 # === User Functions ===
 
 def create_user(email, password_hash, name, profession, verification_token):
@@ -81,63 +447,64 @@ def create_user(email, password_hash, name, profession, verification_token):
 
     cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
     if cursor.fetchone():
+        conn.close()
         return False
 
-    expiry = (datetime.now() + timedelta(hours=1)).replace(microsecond=0)
-
-    expiry_str = expiry.strftime("%Y-%m-%d %H:%M:%S")
-
     cursor.execute("""
-        INSERT INTO users (email, password, name, profession, verified, verification_token, verification_token_expiry)
-        VALUES (?, ?, ?, ?, 0, ?, ?)
-    """, (email, password_hash, name, profession, verification_token, expiry_str))
+        INSERT INTO users (email, password, name, profession, verified)
+        VALUES (?, ?, ?, ?, 0)
+    """, (email, password_hash, name, profession))
+    _issue_token(cursor, email, "verify", verification_token, int(time.time()) + VERIFY_TOKEN_TTL)
 
     conn.commit()
     conn.close()
+    _invalidate_user(email)
     return True
 
 def verify_user_token(token):
     conn = get_connection()
     cursor = conn.cursor()
 
-    cursor.execute("""
-        SELECT email, verified, verification_token_expiry
-        FROM users
-        WHERE verification_token = ?
-    """, (token,))
-    row = cursor.fetchone()
-
-    if row:
-        expiry_str = row["verification_token_expiry"]
-        if expiry_str:
-            expiry = datetime.strptime(expiry_str, "%Y-%m-%d %H:%M:%S")
-            if datetime.now() > expiry:
-                conn.close()
-                return False
-
-        if row["verified"]:
-            conn.close()
-            return True
-
-        cursor.execute("""
-            UPDATE users
-            SET verified = 1, verification_token = NULL, verification_token_expiry = NULL
-            WHERE email = ?
-        """, (row["email"],))
-        conn.commit()
-        conn.close()
-        return True
-    else:
+    email = _lookup_token(cursor, token, "verify")
+    if not email:
         conn.close()
         return False
 
-def get_user(email):
+    cursor.execute("UPDATE users SET verified = 1 WHERE email = ?", (email,))
+    cursor.execute("DELETE FROM auth_tokens WHERE email = ? AND purpose = 'verify'", (email,))
+    conn.commit()
+    conn.close()
+    _invalidate_user(email)
+    return True
+
+# Never returned by get_user, so password hashes and token fields stay out of the shared cache file.
+PRIVATE_USER_FIELDS = {"password", "verification_token", "verification_token_expiry", "reset_token",
+                       "reset_token_expiry"}
+
+def _load_user(email):
     conn = get_connection()
     cursor = conn.cursor()
+    # SELECT * keeps optional columns a deployment may add (e.g. role).
     cursor.execute("SELECT * FROM users WHERE email = ?", (email,))
     user = cursor.fetchone()
     conn.close()
-    return dict(user) if user else None
+    if not user:
+        return None
+    return {key: user[key] for key in user.keys() if key not in PRIVATE_USER_FIELDS}
+
+def get_user(email):
+    # Profiles are read on every rerun; the shared cache serves them across app workers.
+    # Unknown emails aren't cached, so a user who has just registered is found right away.
+    cache = get_cache()
+    user = cache.get("profile", email)
+    if user is None:
+        user = _load_user(email)
+        if user is not None:
+            cache.set("profile", email, user)
+    return user
+
+def _invalidate_user(email):
+    get_cache().delete("profile", email)
 
 def is_user_verified(email):
     user = get_user(email)
@@ -146,10 +513,9 @@ def is_user_verified(email):
 def update_reset_token(email, token, expiry):
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE users SET reset_token = ?, reset_token_expiry = ?
-        WHERE email = ?
-    """, (token, expiry.strftime("%Y-%m-%d %H:%M:%S"), email))
+    # Only the latest reset link stays valid.
+    cursor.execute("DELETE FROM auth_tokens WHERE email = ? AND purpose = 'reset'", (email,))
+    _issue_token(cursor, email, "reset", token, int(expiry.timestamp()))
     conn.commit()
     conn.close()
     
@@ -158,45 +524,29 @@ def reset_user_password_by_token(token, new_hashed_password):
     conn = get_connection()
     cursor = conn.cursor()
 
-    cursor.execute("""
-        SELECT email, reset_token_expiry FROM users
-        WHERE reset_token = ?
-    """, (token,))
-    user = cursor.fetchone()
-
-    if not user:
-        conn.close()
-        return False
-
-    email, expiry = user
-
-    # ✅ FIXED: Match format (no microseconds)
-    if datetime.strptime(expiry, "%Y-%m-%d %H:%M:%S") < datetime.now():
+    email = _lookup_token(cursor, token, "reset")
+    if not email:
         conn.close()
-        return False  # token expired
+        return False  # unknown or expired token
 
     # Update password
-    cursor.execute("""
-        UPDATE users
-        SET password = ?, reset_token = NULL, reset_token_expiry = NULL
-        WHERE email = ?
-    """, (new_hashed_password, email))
+    cursor.execute("UPDATE users SET password = ? WHERE email = ?", (new_hashed_password, email))
+    cursor.execute("DELETE FROM auth_tokens WHERE email = ? AND purpose = 'reset'", (email,))
 
     conn.commit()
     conn.close()
+    _invalidate_user(email)
     return True
 
 
 def reset_password(email, new_hashed_password):
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE users
-        SET password = ?, reset_token = NULL, reset_token_expiry = NULL
-        WHERE email = ?
-    """, (new_hashed_password, email))
+    cursor.execute("UPDATE users SET password = ? WHERE email = ?", (new_hashed_password, email))
+    cursor.execute("DELETE FROM auth_tokens WHERE email = ? AND purpose = 'reset'", (email,))
     conn.commit()
     conn.close()
+    _invalidate_user(email)
 
 def get_all_users():
     conn = get_connection()
@@ -213,23 +563,13 @@ def verify_user_credentials(email, password):
     cursor = conn.cursor()
 
     hashed_password = hashlib.sha256(password.encode()).hexdigest()
-    
-    # 🐞 Debug lines:
-    print(f"[DEBUG] Checking login for: {email}")
-    print(f"[DEBUG] Hashed password: {hashed_password}")
 
     cursor.execute("""
         SELECT * FROM users WHERE email = ? AND password = ?
     """, (email, hashed_password))
-    
+
     user = cursor.fetchone()
     conn.close()
-    
-    if user:
-        print(f"[DEBUG] ✅ User verified: {user[0]}")
-    else:
-        print(f"[DEBUG] ❌ Login failed")
-
     return user is not None
 
 
@@ -240,14 +580,29 @@ def block_user(email, block=True):
     cursor.execute("UPDATE users SET blocked = ? WHERE email = ?", (1 if block else 0, email))
     conn.commit()
     conn.close()
+    _invalidate_user(email)
 
 def count_registered_users():
+    return get_app_stat("registered_users")
+
+# === Data Versions ===
+
+def _bump_data_version(cursor, user_email):
+    cursor.execute("""
+        INSERT INTO data_versions (user_email, version) VALUES (?, 1)
+        ON CONFLICT(user_email) DO UPDATE SET version = version + 1
+    """, (user_email,))
+
+def get_data_version(user_email):
+    """
+    Cheap point lookup used as a cache key for the user's chat/file listings.
+    """
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM users")
-    count = cursor.fetchone()[0]
+    cursor.execute("SELECT version FROM data_versions WHERE user_email = ?", (user_email,))
+    row = cursor.fetchone()
     conn.close()
-    return count
+    return row["version"] if row else 0
 
 # === Chat Functions ===
 
@@ -257,56 +612,298 @@ def save_chat(user_email, user_input, ai_response, thread_id):
     cursor.execute("""
         INSERT INTO chats (user_email, user_input, ai_response, thread_id)
         VALUES (?, ?, ?, ?)
-    """, (user_email, user_input, ai_response, thread_id))
+    """, (user_email, user_input, pack_text(ai_response), thread_id))
+    _bump_data_version(cursor, user_email)
     conn.commit()
     conn.close()
 
-def get_user_chats(user_email):
+def get_user_chats(user_email, limit=None, offset=0):
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM chats WHERE user_email = ? ORDER BY timestamp DESC", (user_email,))
+    cursor.execute("""
+        SELECT * FROM chats WHERE user_email = ?
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ? OFFSET ?
+    """, (user_email, -1 if limit is None else limit, offset))
     chats = cursor.fetchall()
     conn.close()
-    return chats
+    return [_unpack_chat(chat) for chat in chats]
+
+def _unpack_chat(row):
+    chat = dict(row)
+    chat["ai_response"] = unpack_text(chat["ai_response"])
+    return chat
+
+def iter_chats_csv(batch_size=1000):
+    """
+    Yield the chats table as UTF-8 CSV, one batch of rows at a time, straight from a cursor.
+    """
+    import csv
+    import io
 
-def export_chats_to_csv():
     conn = get_connection()
-    df = pd.read_sql_query("SELECT * FROM chats", conn)
-    conn.close()
-    return df.to_csv(index=False).encode('utf-8')
+    try:
+        cursor = conn.execute("SELECT * FROM chats ORDER BY id")
+        columns = [column[0] for column in cursor.description]
+        response_index = columns.index("ai_response")
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(columns)
+        while rows := cursor.fetchmany(batch_size):
+            for row in rows:
+                row = list(row)
+                row[response_index] = unpack_text(row[response_index])
+                writer.writerow(row)
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+    finally:
+        conn.close()
+
+def export_chats_to_csv():
+    return b"".join(iter_chats_csv())
 
 # === File Functions ===
 
-def save_uploaded_file(user_email, file_name, file_type, extracted_text):
+def save_uploaded_file(user_email, file_name, file_type, extracted_text, job_id=None):
+    """
+    Insert the file row. With ``job_id``, that upload job is marked done in the
+    same transaction, so a crash can never leave a saved file behind a job
+    that will run (and save it) again.
+    """
+    # The text goes to data/texts/ rather than the row; extracted_text stays NULL.
+    # It is written before the transaction starts so the write lock is held briefly.
+    staged = text_store.write_text(extracted_text)
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO uploaded_files (user_email, file_name, file_type, extracted_text)
-        VALUES (?, ?, ?, ?)
-    """, (user_email, file_name, file_type, extracted_text))
-    conn.commit()
-    conn.close()
+    try:
+        cursor.execute("""
+            INSERT INTO uploaded_files (user_email, file_name, file_type)
+            VALUES (?, ?, ?)
+        """, (user_email, file_name, file_type))
+        file_id = cursor.lastrowid
+        text_store.index_text(cursor, file_id, staged)
+        _bump_data_version(cursor, user_email)
+        if job_id is not None:
+            cursor.execute("""
+                UPDATE upload_jobs SET status = 'done', file_id = ?, error = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (file_id, job_id))
+        conn.commit()
+    except BaseException:
+        text_store.discard_text_file(staged["path"])
+        raise
+    finally:
+        conn.close()
+    text_store.commit_text_file(staged["path"])
+    return file_id
 
-def get_uploaded_files(user_email):
+def get_uploaded_files(user_email, limit=None, offset=0):
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
         SELECT id, file_name, file_type, timestamp 
         FROM uploaded_files 
         WHERE user_email = ?
-        ORDER BY timestamp DESC
-    """, (user_email,))
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ? OFFSET ?
+    """, (user_email, -1 if limit is None else limit, offset))
     files = cursor.fetchall()
     conn.close()
     return [dict(file) for file in files]
 
-def get_file_content(file_id):
+def count_uploaded_files(user_email):
     conn = get_connection()
     cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM uploaded_files WHERE user_email = ?", (user_email,))
+    count = cursor.fetchone()[0]
+    conn.close()
+    return count
+
+def _inline_text(cursor, file_id):
+    # Rows saved before the text store (or not yet migrated) keep their text inline.
     cursor.execute("SELECT extracted_text FROM uploaded_files WHERE id = ?", (file_id,))
     result = cursor.fetchone()
+    return unpack_text(result["extracted_text"]) if result else None
+
+def get_file_content(file_id):
+    return get_file_text(file_id)
+
+def get_file_text(file_id, start=0, length=None):
+    """
+    Characters ``start`` .. ``start + length`` of a file's extracted text (all of it
+    when ``length`` is None). Only the bytes covering that range are read.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        text = text_store.read_text(cursor, file_id, start, length)
+        if text is None:
+            text = _inline_text(cursor, file_id)
+            if text is not None:
+                text = text[start:] if length is None else text[start:start + length]
+    finally:
+        conn.close()
+    return text
+
+def get_file_pages(file_id, first, last=None):
+    """
+    Text of pages ``first`` .. ``last`` (1-based, inclusive). PDF pages are
+    separated by form feeds; other files are a single page.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        text = text_store.read_pages(cursor, file_id, first, last)
+        if text is None:
+            text = _inline_text(cursor, file_id)
+            if text is not None:
+                text = text_store.PAGE_BREAK.join(
+                    text.split(text_store.PAGE_BREAK)[first - 1:first if last is None else last]
+                )
+    finally:
+        conn.close()
+    return text
+
+def count_file_pages(file_id):
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        info = text_store.get_text_info(cursor, file_id)
+        if info is not None:
+            return info["n_pages"]
+        text = _inline_text(cursor, file_id)
+        return None if text is None else text.count(text_store.PAGE_BREAK) + 1
+    finally:
+        conn.close()
+
+# === Upload Jobs ===
+
+def create_upload_job(user_email, file_name, file_type, spool_path):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO upload_jobs (user_email, file_name, file_type, spool_path)
+        VALUES (?, ?, ?, ?)
+    """, (user_email, file_name, file_type, spool_path))
+    job_id = cursor.lastrowid
+    conn.commit()
+    conn.close()
+    return job_id
+
+def claim_upload_job(job_id, worker):
+    """
+    Move a queued job to 'running'. Returns the job dict, or None if another worker got it first.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE upload_jobs
+        SET status = 'running', claimed_by = ?, attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ? AND status = 'queued'
+    """, (worker, job_id))
+    claimed = cursor.rowcount == 1
+    conn.commit()
+    job = None
+    if claimed:
+        cursor.execute("SELECT * FROM upload_jobs WHERE id = ?", (job_id,))
+        job = dict(cursor.fetchone())
+    conn.close()
+    return job
+
+def finish_upload_job(job_id, status, file_id=None, error=None):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE upload_jobs
+        SET status = ?, file_id = ?, error = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ?
+    """, (status, file_id, error, job_id))
+    conn.commit()
+    conn.close()
+
+def heartbeat_upload_jobs(worker):
+    """
+    Renew the lease (updated_at) on every job ``worker`` is running.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        UPDATE upload_jobs SET updated_at = CURRENT_TIMESTAMP
+        WHERE status = 'running' AND claimed_by = ?
+    """, (worker,))
+    conn.commit()
+    conn.close()
+
+def requeue_stale_upload_jobs(worker, lease_s):
+    """
+    Requeue running jobs of other workers whose lease is older than ``lease_s``
+    seconds (their process died or hung). Returns the requeued job ids.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    stale = """
+        status = 'running' AND (claimed_by IS NULL OR claimed_by != ?)
+        AND updated_at < datetime('now', ?)
+    """
+    params = (worker, f"-{int(lease_s)} seconds")
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        job_ids = [row["id"] for row in cursor.execute(f"SELECT id FROM upload_jobs WHERE {stale}", params)]
+        cursor.execute(f"""
+            UPDATE upload_jobs SET status = 'queued', claimed_by = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE {stale}
+        """, params)
+        conn.commit()
+    finally:
+        conn.close()
+    return job_ids
+
+def get_upload_jobs(user_email=None, status=None, limit=None):
+    conn = get_connection()
+    cursor = conn.cursor()
+    clauses, params = [], []
+    if user_email is not None:
+        clauses.append("user_email = ?")
+        params.append(user_email)
+    if status is not None:
+        clauses.append("status = ?")
+        params.append(status)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    cursor.execute(f"""
+        SELECT id, user_email, file_name, file_type, spool_path, status, error, file_id,
+               claimed_by, attempts, created_at, updated_at
+        FROM upload_jobs {where}
+        ORDER BY id DESC
+        LIMIT ?
+    """, (*params, -1 if limit is None else limit))
+    jobs = cursor.fetchall()
+    conn.close()
+    return [dict(job) for job in jobs]
+
+# === Transcription Cache ===
+
+def get_cached_transcript(audio_hash, backend):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT text FROM transcription_cache WHERE audio_hash = ? AND backend = ?
+    """, (audio_hash, backend))
+    row = cursor.fetchone()
+    conn.close()
+    return row["text"] if row else None
+
+def save_transcript(audio_hash, backend, text):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT OR REPLACE INTO transcription_cache (audio_hash, backend, text)
+        VALUES (?, ?, ?)
+    """, (audio_hash, backend, text))
+    conn.commit()
     conn.close()
-    return result["extracted_text"] if result else None
 
 # === Email Logs ===
 
@@ -333,13 +930,94 @@ def get_email_logs(limit=20):
     conn.close()
     return [dict(row) for row in rows]
 
+# === Payload Compression Migration ===
+
+COMPRESSED_COLUMNS = [("uploaded_files", "extracted_text"), ("chats", "ai_response")]
+
+def migrate_compress_payloads(batch_size=200, threshold=None):
+    """
+    Compress existing large TEXT payloads in place, in small batches so the app
+    can keep writing. Safe to re-run: already-compressed rows are BLOBs and skipped.
+    Freed pages are returned by the incremental vacuum job in src/maintenance.py.
+    """
+    threshold = COMPRESS_THRESHOLD_BYTES if threshold is None else threshold
+    migrated = {}
+    conn = get_connection()
+    for table, column in COMPRESSED_COLUMNS:
+        count = 0
+        last_id = 0
+        while True:
+            rows = conn.execute(f"""
+                SELECT id, {column} FROM {table}
+                WHERE id > ? AND typeof({column}) = 'text' AND length(CAST({column} AS BLOB)) >= ?
+                ORDER BY id LIMIT ?
+            """, (last_id, threshold, batch_size)).fetchall()
+            if not rows:
+                break
+            conn.executemany(
+                f"UPDATE {table} SET {column} = ? WHERE id = ?",
+                [(pack_text(row[column], threshold), row["id"]) for row in rows],
+            )
+            conn.commit()
+            count += len(rows)
+            last_id = rows[-1]["id"]
+        migrated[table] = count
+    conn.close()
+    return migrated
+
+# === Text Store Migration ===
+
+def migrate_inline_texts(batch_size=50):
+    """
+    Move inline extracted_text values into the file-backed text store, a few
+    rows per transaction. Safe to re-run: migrated rows have a NULL column.
+    Each run first finishes or removes text files a crash left under their
+    temporary names (see text_store.recover_text_files).
+    """
+    moved = 0
+    last_id = 0
+    conn = get_connection()
+    cursor = conn.cursor()
+    paths = []
+    try:
+        text_store.recover_text_files(cursor)
+        while True:
+            rows = cursor.execute("""
+                SELECT id, extracted_text FROM uploaded_files
+                WHERE id > ? AND extracted_text IS NOT NULL
+                ORDER BY id LIMIT ?
+            """, (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            # Write the batch's files before the first UPDATE opens the transaction.
+            staged = []
+            for row in rows:
+                staged.append(text_store.write_text(unpack_text(row["extracted_text"])))
+                paths.append(staged[-1]["path"])
+            for row, text in zip(rows, staged):
+                text_store.index_text(cursor, row["id"], text)
+                cursor.execute("UPDATE uploaded_files SET extracted_text = NULL WHERE id = ?", (row["id"],))
+            conn.commit()
+            for path in paths:
+                text_store.commit_text_file(path)
+            paths = []
+            moved += len(rows)
+            last_id = rows[-1]["id"]
+    finally:
+        for path in paths:
+            text_store.discard_text_file(path)
+        conn.close()
+    return moved
+
 # === Safe Init ===
 
 def safe_initialize():
     try:
         create_tables()
+        migrate_legacy_tokens()
     except sqlite3.DatabaseError as e:
         print(f"[ERROR] Database is corrupted: {e}")
+        close_pool()
         try:
             backup_path = DB_FILE + ".corrupt.bak"
             os.rename(DB_FILE, backup_path)
@@ -355,5 +1033,10 @@ def safe_initialize():
             print(f"[X] Failed to recreate database: {final_err}")
             sys.exit(1)
 
+
 if __name__ == "__main__":
     safe_initialize()
+    if "--compress" in sys.argv:
+        print(f"Compressed rows: {migrate_compress_payloads()}")
+    if "--text-store" in sys.argv:
+        print(f"Moved {migrate_inline_texts()} extracted texts to {text_store.TEXT_DIR}")
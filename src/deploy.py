@@ -0,0 +1,165 @@
+"""
+Multi-process deployment: several Streamlit workers behind a local proxy.
+
+Streamlit serves every session from one Python process, so a single
+instance only ever uses one core. This launcher starts ``--workers``
+copies of ``app.py`` on consecutive internal ports and a small TCP proxy
+on the public port. The proxy pins each browser to one worker with a
+cookie (Streamlit keeps session state in the worker's memory and talks over
+a long-lived websocket, so a session must not move): a request without the
+cookie goes to the next worker in turn and the response sets the cookie.
+Pinning on the cookie rather than the client IP keeps users behind one NAT
+or corporate proxy spread across workers. If the pinned worker is down the
+proxy fails over to the next one and re-pins. Clients that drop cookies
+still work, but each connection may land on a different worker. Workers
+share the SQLite database and the cross-process cache in
+src/shared_cache.py, so a warm cache in one worker benefits all.
+
+Usage:
+    python -m src.deploy --workers 4 --port 8501
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import signal
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_worker(port):
+    return subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "app.py",
+         "--server.port", str(port), "--server.address", "127.0.0.1", "--server.headless", "true"],
+        cwd=ROOT,
+    )
+
+
+STICKY_COOKIE = "st_worker"
+
+
+class Proxy:
+    def __init__(self, worker_ports):
+        self.worker_ports = worker_ports
+        self._turn = itertools.count()
+
+    def _pinned_port(self, head):
+        """
+        The worker port named by the sticky cookie in a request head, or None.
+        """
+        for line in head.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            if name.strip().lower() != b"cookie":
+                continue
+            for cookie in value.decode("latin-1").split(";"):
+                key, _, port = cookie.strip().partition("=")
+                if key == STICKY_COOKIE and port.isdigit() and int(port) in self.worker_ports:
+                    return int(port)
+        return None
+
+    def _ordered_ports(self, pinned):
+        # The pinned worker (or the next in turn for new clients), with the rest as fallbacks.
+        if pinned is None:
+            start = next(self._turn) % len(self.worker_ports)
+        else:
+            start = self.worker_ports.index(pinned)
+        return self.worker_ports[start:] + self.worker_ports[:start]
+
+    async def _pipe(self, reader, writer, extra_header=None):
+        try:
+            if extra_header:
+                # Add the header right after the status line of the first response.
+                writer.write(await reader.readuntil(b"\r\n") + extra_header)
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, client_reader, client_writer):
+        # Only the first request of a connection is inspected; keep-alive requests follow it.
+        try:
+            head = await client_reader.readuntil(b"\r\n\r\n")
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            client_writer.close()
+            return
+
+        pinned = self._pinned_port(head)
+        for port in self._ordered_ports(pinned):
+            try:
+                upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", port)
+                break
+            except OSError:
+                continue
+        else:
+            client_writer.close()
+            return
+
+        upstream_writer.write(head)
+        set_cookie = None
+        if port != pinned:
+            set_cookie = f"Set-Cookie: {STICKY_COOKIE}={port}; Path=/; HttpOnly; SameSite=Lax\r\n".encode()
+        await asyncio.gather(
+            self._pipe(client_reader, upstream_writer),
+            self._pipe(upstream_reader, client_writer, set_cookie),
+        )
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+async def supervise(workers, ports):
+    """
+    Restart workers that exit, so one crash doesn't take a slot offline.
+    """
+    while True:
+        await asyncio.sleep(5)
+        for i, proc in enumerate(workers):
+            if proc.poll() is not None:
+                print(f"[deploy] worker on port {ports[i]} exited ({proc.returncode}), restarting")
+                workers[i] = start_worker(ports[i])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8501)
+    parser.add_argument("--worker-base-port", type=int, default=8601)
+    args = parser.parse_args()
+
+    ports = [args.worker_base_port + i for i in range(args.workers)]
+    workers = [start_worker(port) for port in ports]
+    print(f"[deploy] {args.workers} workers on ports {ports[0]}-{ports[-1]}, proxy on {args.host}:{args.port}")
+
+    def shutdown(*_):
+        for proc in workers:
+            proc.terminate()
+        deadline = time.time() + 10
+        for proc in workers:
+            try:
+                proc.wait(timeout=max(0, deadline - time.time()))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+
+    async def run():
+        await asyncio.gather(Proxy(ports).serve(args.host, args.port), supervise(workers, ports))
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        shutdown()
+
+
+if __name__ == "__main__":
+    main()
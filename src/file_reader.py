@@ -1,27 +1,43 @@
-import pandas as pd
-import fitz  # PyMuPDF
+# pandas and PyMuPDF are imported inside the extractors so that loading this
+# module (on every Streamlit rerun) stays cheap until a file is actually uploaded.
 
 def extract_pdf(uploaded_pdf):
+    import fitz  # PyMuPDF
     doc = fitz.open(stream=uploaded_pdf.read(), filetype="pdf")
-    text = ""
-    for page in doc:
-        text += page.get_text()
-    return text
+    # Pages are separated by form feeds so the text store can index page boundaries.
+    return "\f".join(page.get_text() for page in doc)
 
 def extract_txt(uploaded_txt):
     return uploaded_txt.read().decode("utf-8")
 
-def extract_excel(uploaded_xlsx):
-    df = pd.read_excel(uploaded_xlsx)
-    return df.to_string(index=False)
+def extract_tables(uploaded_table):
+    """
+    Ingest a CSV/XLSX upload (every sheet) into staged Parquet tables and
+    return (summary_text, tables). See src/tabular.py.
+    """
+    from src.tabular import ingest_tables, describe_tables
+    tables = ingest_tables(uploaded_table)
+    return describe_tables(tables), tables
 
-        
-def extract_file(uploaded_file):
-    if uploaded_file.type == "application/pdf":
-        return extract_pdf(uploaded_file)
+def extract_document(uploaded_file):
+    """
+    Like extract_file, but also returns the staged tables for spreadsheets
+    so the caller can register them once the file row exists.
+    """
+    from src.tabular import table_kind
+
+    if table_kind(uploaded_file):
+        return extract_tables(uploaded_file)
+    elif uploaded_file.type == "application/pdf":
+        return extract_pdf(uploaded_file), []
     elif uploaded_file.type == "text/plain":
-        return extract_txt(uploaded_file)
-    elif uploaded_file.type in ["application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "application/vnd.ms-excel"]:
-        return extract_excel(uploaded_file)
+        return extract_txt(uploaded_file), []
     else:
         raise ValueError("Unsupported file type")
+
+def extract_file(uploaded_file):
+    from src.tabular import discard_tables
+
+    text, tables = extract_document(uploaded_file)
+    discard_tables(tables)
+    return text
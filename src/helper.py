@@ -1,52 +1,124 @@
 import os
 import smtplib
+import time
 import streamlit as st
-import google.generativeai as genai
 from email.mime.text import MIMEText
 
+from src.llm_client import LLMError, get_llm_client
+from src.semantic_cache import get_semantic_cache
+from src.shared_cache import get_cache, make_key
+
+
+def get_secret(name, default=None):
+    """
+    Read a setting from Streamlit secrets, falling back to the environment
+    (the API server and CLI tools may run without a secrets.toml).
+    """
+    try:
+        value = st.secrets.get(name)
+    except Exception:
+        value = None
+    return value or os.environ.get(name, default)
+
 
 # Gemini AI Setup
-GEMINI_API_KEY = st.secrets["GEMINI_API_KEY"]
-try:
-    if not GEMINI_API_KEY:
+GEMINI_MODEL_NAME = "models/gemini-1.5-flash-latest"
+
+
+@st.cache_resource(show_spinner=False)
+def _load_gemini_model(model_name):
+    # Imported here so the SDK is only loaded once a chat actually needs it.
+    import google.generativeai as genai
+
+    api_key = get_secret("GEMINI_API_KEY")
+    if not api_key:
         raise ValueError("GEMINI_API_KEY is not set in Streamlit secrets.")
-    genai.configure(api_key=GEMINI_API_KEY)
-except Exception as e:
-    print("❌ Failed to configure Gemini:", e)
-    genai = None
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
 
 
-def gemini_model_object(user_input):
-    if not genai:
-        return "Gemini is not properly configured. Check API key or SDK."
+def get_gemini_model(model_name=GEMINI_MODEL_NAME):
+    """
+    Return a process-wide Gemini model client, or None if the SDK is not configured.
+    Failures are not cached, so fixing the secret takes effect on the next call.
+    """
     try:
-        model = genai.GenerativeModel("models/gemini-1.5-flash-latest")
-
-        response = model.generate_content({
-            "parts": [
-                {"text": user_input}
-            ]
-        })
-        return response.text
+        return _load_gemini_model(model_name)
     except Exception as e:
-        return f"Error from Gemini API: {str(e)}"
+        print("❌ Failed to configure Gemini:", e)
+        return None
 
 
+def gemini_model_object(user_input):
+    return get_llm_client().generate(user_input)
 
-def ai_chat_response(prompt: str) -> str:
 
-    if not genai:
-        return "Gemini is not properly configured. Check API key or SDK."
-    try:
-        model = genai.GenerativeModel("models/gemini-1.5-flash-latest")
-        response = model.generate_content({
-            "parts": [
-                {"text": prompt}
-            ]
-        })
-        return response.text.strip()
-    except Exception as e:
-        return f"Error from Gemini API: {str(e)}"
+def build_chat_prompt(past_chats, user_input, context=None):
+    """
+    Prompt for a new message: optional file context, then the recent exchanges
+    (``past_chats`` newest first, as returned by get_user_chats), then the message.
+    """
+    history = ""
+    for chat in reversed(past_chats):
+        history += f"User: {chat['user_input'][:500]}\nAI: {chat['ai_response'][:500]}\n\n"
+    prompt = history + f"User: {user_input}\nAI:"
+    if context:
+        prompt = context + "\n\n" + prompt
+    return prompt
+
+
+def ai_chat_response(prompt: str, semantic_key: str = None, user: str = None,
+                     semantic_context: str = None) -> str:
+    """
+    ``semantic_key`` is the bare user question; when given and the semantic cache
+    is enabled, paraphrases of an earlier question (within ``user``'s scope, asked
+    with the same ``semantic_context``) are answered from it. Leave it unset when
+    the question may refer to earlier turns of the conversation.
+
+    Raises LLMError when no model could answer; errors are never cached or returned as text.
+    """
+
+    # Shared across app workers, so a prompt answered by one process is free for the others.
+    cache = get_cache()
+    cache_key = make_key(GEMINI_MODEL_NAME, prompt)
+    cached = cache.get("llm", cache_key)
+    if cached is not None:
+        return cached
+
+    semantic = get_semantic_cache() if semantic_key else None
+    if semantic is not None:
+        similar = semantic.lookup(semantic_key, user, semantic_context)
+        if similar is not None:
+            return similar
+
+    start = time.perf_counter()
+    text = get_llm_client().generate(prompt)
+
+    cache.set("llm", cache_key, text)
+    if semantic is not None:
+        semantic.store(semantic_key, text, user, latency=time.perf_counter() - start, context=semantic_context)
+    return text
+
+
+def ai_chat_response_stream(prompt: str):
+    """
+    Yield the response in pieces as Gemini produces them. The full text is
+    cached once the stream completes, so a repeat prompt is served in one piece.
+    Raises LLMError (before or during the stream) instead of yielding error text.
+    """
+    cache = get_cache()
+    cache_key = make_key(GEMINI_MODEL_NAME, prompt)
+    cached = cache.get("llm", cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    for chunk in get_llm_client().stream(prompt):
+        parts.append(chunk)
+        yield chunk
+
+    cache.set("llm", cache_key, "".join(parts).strip())
 
 
 def send_email(to_email, subject, body):
@@ -83,4 +155,7 @@ def send_email(to_email, subject, body):
 
 if __name__ == "__main__":
     test_input = "Hello, how are you?"
-    print("AI Response:", ai_chat_response(test_input))
+    try:
+        print("AI Response:", ai_chat_response(test_input))
+    except LLMError as e:
+        print("❌", e)
@@ -0,0 +1,197 @@
+"""
+Cold-start guard for the Streamlit app.
+
+Runs the app's top-level imports (read from app.py itself) in a fresh
+interpreter with ``-X importtime`` and fails if the login page would pull in
+heavy SDKs (Gemini, OpenAI, pandas, PyMuPDF, googletrans, ...) or if our own
+modules take longer than the budget to import. Streamlit re-executes
+``app.py`` on every interaction, so keeping these imports lean is what keeps
+both cold start and reruns fast.
+
+``--reruns N`` also times N reruns of the login page and of a logged-in user
+panel through Streamlit's AppTest, in a throwaway working directory.
+
+Usage:
+    python -m src.import_profile [--budget-ms 150] [--reruns 10]
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_FILE = os.path.join(ROOT, "app.py")
+
+
+def app_modules(path=APP_FILE):
+    """
+    Our own modules that ``path`` imports at module level. Imports inside
+    functions are lazy and deliberately left out.
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    modules = []
+    pending = list(tree.body)
+    while pending:
+        node = pending.pop(0)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names = [node.module]
+            if node.module == "src":
+                names = [f"src.{alias.name}" for alias in node.names]
+        else:
+            pending.extend(child for child in ast.iter_child_nodes(node) if isinstance(child, ast.stmt))
+            continue
+        modules.extend(name for name in names if name.startswith("src.") and name not in modules)
+    return modules
+
+# Packages that must only be loaded on first use.
+HEAVY_MODULES = [
+    "google.generativeai",
+    "openai",
+    "pandas",
+    "fitz",
+    "googletrans",
+    "pydub",
+    "gtts",
+    "pygame",
+]
+
+DEFAULT_BUDGET_MS = 150
+
+
+def profile_imports(modules=None):
+    """
+    Import ``modules`` (default: app.py's own imports) in a subprocess, after
+    streamlit, which we always pay for, and return a list of
+    (module, self_us, cumulative_us) rows.
+    """
+    modules = app_modules() if modules is None else modules
+    code = "import streamlit\n" + "".join(f"import {m}\n" for m in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    seen_streamlit = False
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        # Everything up to and including the top-level streamlit import is baseline.
+        if not seen_streamlit:
+            if name == "streamlit":
+                seen_streamlit = True
+            continue
+        rows.append((name, int(parts[0]), int(parts[1])))
+    return rows
+
+
+def check(budget_ms=DEFAULT_BUDGET_MS):
+    rows = profile_imports()
+    loaded = {name for name, _, _ in rows}
+    problems = []
+
+    for heavy in HEAVY_MODULES:
+        if heavy in loaded:
+            problems.append(f"heavy module '{heavy}' is imported at startup")
+
+    total_us = sum(self_us for _, self_us, _ in rows)
+    if total_us / 1000 > budget_ms:
+        problems.append(f"app imports took {total_us / 1000:.1f} ms (budget {budget_ms} ms)")
+
+    slowest = sorted(rows, key=lambda r: r[1], reverse=True)[:10]
+    print(f"App imports on top of streamlit: {total_us / 1000:.1f} ms across {len(rows)} modules")
+    for name, self_us, cum_us in slowest:
+        print(f"  {self_us / 1000:8.2f} ms self  {cum_us / 1000:8.2f} ms cumulative  {name}")
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print("✅ Import profile within budget.")
+    return not problems
+
+
+def _time_reruns(runs):
+    # Runs inside the throwaway working directory set up by profile_reruns.
+    import hashlib
+    from streamlit.testing.v1 import AppTest
+    from src import db
+
+    db.safe_initialize()
+    conn = db.get_connection()
+    conn.execute("INSERT INTO users (email, password, name, verified) VALUES ('profile@example.com', ?, 'Profile', 1)",
+                 (hashlib.sha256(b"profile").hexdigest(),))
+    conn.commit()
+    conn.close()
+
+    at = AppTest.from_file(APP_FILE, default_timeout=120)
+    timings = {}
+    for page in ("login", "user panel"):
+        if page == "user panel":
+            at.session_state["user"] = "profile@example.com"
+        start = time.perf_counter()
+        at.run()
+        first = time.perf_counter() - start
+        reruns = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            at.run()
+            reruns.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(f"{page} raised: {at.exception[0].message}")
+        timings[page] = {"first_ms": first * 1000, "reruns_ms": sorted(r * 1000 for r in reruns)}
+    print(json.dumps(timings))
+
+
+def profile_reruns(runs=10):
+    """
+    Time reruns of app.py in a subprocess whose working directory (and so the
+    database, caches and data/ files) is a temporary directory.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+        proc = subprocess.run(
+            [sys.executable, "-m", "src.import_profile", "--rerun-worker", str(runs)],
+            cwd=tmp, env=env, capture_output=True, text=True,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Rerun profiling failed:\n{proc.stderr[-2000:]}")
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    for page, timing in timings.items():
+        reruns = timing["reruns_ms"]
+        print(f"{page:>10}: first run {timing['first_ms']:8.1f} ms  rerun p50 {reruns[len(reruns) // 2]:8.1f} ms  "
+              f"max {reruns[-1]:8.1f} ms  ({len(reruns)} reruns)")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--reruns", type=int, default=0)
+    parser.add_argument("--rerun-worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.rerun_worker:
+        _time_reruns(args.rerun_worker)
+        sys.exit(0)
+    ok = check(args.budget_ms)
+    if args.reruns:
+        profile_reruns(args.reruns)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,359 @@
+"""
+Resilient call layer for the LLM.
+
+Every request gets a timeout. Failures are retried with full-jitter
+exponential backoff. If the first attempt hasn't answered by the recent
+p95 latency, a duplicate (hedged) request is sent and whichever finishes
+first wins. Each model has a circuit breaker: after repeated failures it
+fails fast for a cool-down period and the call moves on to the next
+fallback model. When nothing succeeds, LLMUnavailableError is raised, so
+callers can never mistake an error for an answer.
+
+Only transient failures (timeouts, 5xx, rate limits, dropped connections)
+are retried and counted by the breakers. A prompt the model rejects
+(blocked by safety filters, 400 InvalidArgument) would fail the same way
+everywhere, so it raises LLMRequestError at once: one bad prompt can't trip
+the breakers and cut off every user.
+
+Backends:
+    GeminiBackend - google-generativeai, one cached client per model
+    FakeBackend   - configurable latency, failures and hangs for fault injection
+
+Fault-injection tests: tests/test_llm_client.py
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+LLM_TIMEOUT_S = float(os.environ.get("LLM_TIMEOUT_S", 30))
+LLM_RETRIES = int(os.environ.get("LLM_RETRIES", 2))
+LLM_BACKOFF_BASE_S = 0.5
+LLM_BACKOFF_MAX_S = 8.0
+LLM_HEDGE_DEFAULT_S = float(os.environ.get("LLM_HEDGE_DEFAULT_S", 3.0))
+LLM_FALLBACK_MODELS = [
+    m.strip() for m in os.environ.get("LLM_FALLBACK_MODELS", "models/gemini-1.5-flash-8b").split(",") if m.strip()
+]
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_S = 30.0
+
+
+class LLMError(Exception):
+    """Base class for failures of the LLM call layer."""
+
+
+class LLMTimeoutError(LLMError):
+    pass
+
+
+class LLMUnavailableError(LLMError):
+    """No model produced an answer (all attempts failed or every circuit is open)."""
+
+
+class LLMRequestError(LLMError):
+    """The model rejected this request (e.g. a safety block); retrying or switching models won't help."""
+
+
+# HTTP statuses that mean "try again later"; any other 4xx is a problem with the request itself.
+_RETRYABLE_STATUS = {408, 429}
+
+
+def is_retryable(error):
+    """
+    Whether ``error`` is worth another attempt. google-api-core errors carry
+    the HTTP status in ``.code``; Gemini raises ValueError when a response
+    was blocked or has no candidates.
+    """
+    if isinstance(error, (LLMRequestError, LLMUnavailableError, ValueError)):
+        return False
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and 400 <= code < 500:
+        return code in _RETRYABLE_STATUS
+    return True
+
+
+def _request_error(error):
+    if isinstance(error, LLMError):
+        return error
+    return LLMRequestError(f"The model could not answer this request ({error}).")
+
+
+# === Backends ===
+
+class GeminiBackend:
+    def generate(self, prompt, model, timeout):
+        from src.helper import get_gemini_model
+
+        client = get_gemini_model(model)
+        if client is None:
+            raise LLMUnavailableError("Gemini is not properly configured. Check API key or SDK.")
+        response = client.generate_content(
+            {"parts": [{"text": prompt}]},
+            request_options={"timeout": timeout},
+        )
+        # .text raises ValueError when the response was blocked or has no candidates;
+        # the call layer treats that as a rejected request, not an outage.
+        text = response.text.strip()
+        if not text:
+            raise LLMError("Empty response from Gemini")
+        return text
+
+    def stream(self, prompt, model, timeout):
+        from src.helper import get_gemini_model
+
+        client = get_gemini_model(model)
+        if client is None:
+            raise LLMUnavailableError("Gemini is not properly configured. Check API key or SDK.")
+        for chunk in client.generate_content(
+            {"parts": [{"text": prompt}]}, stream=True, request_options={"timeout": timeout}
+        ):
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeBackend:
+    """
+    Deterministic (seeded) fault injection. ``latency`` is a callable or a
+    number of seconds; ``failure_rate`` and ``hang_rate`` apply per call;
+    models listed in ``down_models`` always fail. Injected failures raise
+    ``failure_error`` (RuntimeError is transient, ValueError is a rejection).
+    """
+
+    def __init__(self, latency=0.01, failure_rate=0.0, hang_rate=0.0, hang_s=60.0, down_models=(), seed=0,
+                 failure_error=RuntimeError):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_error = failure_error
+        self.hang_rate = hang_rate
+        self.hang_s = hang_s
+        self.down_models = set(down_models)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def generate(self, prompt, model, timeout):
+        with self.lock:
+            self.calls += 1
+            roll = self.rng.random()
+            latency = self.latency() if callable(self.latency) else self.latency
+        if model in self.down_models or roll < self.failure_rate:
+            time.sleep(latency)
+            raise self.failure_error(f"injected failure from {model}")
+        if roll < self.failure_rate + self.hang_rate:
+            time.sleep(min(self.hang_s, timeout))
+            raise LLMTimeoutError(f"injected hang from {model}")
+        time.sleep(latency)
+        return f"[{model}] answer to: {prompt[-40:]}"
+
+    def stream(self, prompt, model, timeout):
+        yield self.generate(prompt, model, timeout)
+
+
+# === Circuit breaker / latency tracking ===
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_s=BREAKER_RESET_S):
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self.opened_at >= self.reset_s else "open"
+
+    def allow(self):
+        # Half-open lets traffic probe again; one success closes, one failure re-opens.
+        return self.state != "open"
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    def __init__(self, window=200, min_samples=20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def p95(self, default):
+        with self.lock:
+            if len(self.samples) < self.min_samples:
+                return default
+            ordered = sorted(self.samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+
+# === Client ===
+
+class ResilientLLM:
+    def __init__(self, backend=None, model=None, fallback_models=None, timeout=LLM_TIMEOUT_S,
+                 retries=LLM_RETRIES, hedge=True, hedge_default_s=LLM_HEDGE_DEFAULT_S,
+                 backoff_base_s=LLM_BACKOFF_BASE_S, backoff_max_s=LLM_BACKOFF_MAX_S, max_workers=32):
+        from src.helper import GEMINI_MODEL_NAME
+
+        self.backend = backend or GeminiBackend()
+        self.models = [model or GEMINI_MODEL_NAME] + list(
+            LLM_FALLBACK_MODELS if fallback_models is None else fallback_models
+        )
+        self.timeout = timeout
+        self.retries = retries
+        self.hedge = hedge
+        self.hedge_default_s = hedge_default_s
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.breakers = {m: CircuitBreaker() for m in self.models}
+        self.latency = {m: LatencyTracker() for m in self.models}
+        # Calls that time out keep running in their thread, so the pool is sized generously.
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self.stats = {"calls": 0, "hedges": 0, "hedge_wins": 0, "retries": 0, "fallbacks": 0,
+                      "fast_fails": 0, "failures": 0, "rejected": 0}
+
+    def _backoff(self, attempt):
+        # Full jitter: sleep uniformly in [0, min(max, base * 2^attempt)].
+        time.sleep(random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * 2 ** attempt)))
+
+    def _timed(self, model, prompt):
+        start = time.monotonic()
+        text = self.backend.generate(prompt, model, self.timeout)
+        self.latency[model].record(time.monotonic() - start)
+        return text
+
+    def _call(self, model, prompt):
+        """
+        One logical attempt: the primary request plus, if it is slower than the
+        recent p95, a hedged duplicate. Returns the first successful result.
+        """
+        deadline = time.monotonic() + self.timeout
+        futures = [self.pool.submit(self._timed, model, prompt)]
+        hedge_after = self.latency[model].p95(self.hedge_default_s)
+        errors = []
+
+        if self.hedge and hedge_after < self.timeout:
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                self.stats["hedges"] += 1
+                futures.append(self.pool.submit(self._timed, model, prompt))
+
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        self.stats["hedge_wins"] += 1
+                    return future.result()
+                if not is_retryable(future.exception()):
+                    # The hedge would be rejected the same way; don't wait for it.
+                    raise future.exception()
+                errors.append(future.exception())
+
+        if pending:
+            raise LLMTimeoutError(f"{model} did not answer within {self.timeout:g}s")
+        raise errors[-1]
+
+    def generate(self, prompt):
+        self.stats["calls"] += 1
+        last_error = None
+        for index, model in enumerate(self.models):
+            breaker = self.breakers[model]
+            if not breaker.allow():
+                self.stats["fast_fails"] += 1
+                continue
+            if index > 0:
+                self.stats["fallbacks"] += 1
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    self.stats["retries"] += 1
+                    self._backoff(attempt - 1)
+                try:
+                    text = self._call(model, prompt)
+                except Exception as e:
+                    if not is_retryable(e):
+                        # Not the model's fault, so the breaker doesn't count it.
+                        self.stats["rejected"] += 1
+                        raise _request_error(e) from e
+                    last_error = e
+                    breaker.record_failure()
+                    if not breaker.allow():
+                        break
+                    continue
+                breaker.record_success()
+                return text
+
+        self.stats["failures"] += 1
+        raise LLMUnavailableError(f"The assistant is temporarily unavailable ({last_error or 'circuit open'}).")
+
+    def stream(self, prompt):
+        """
+        Stream from the first model whose circuit is closed. Retries and fallbacks
+        only happen before the first chunk; a failure mid-stream is raised.
+        """
+        last_error = None
+        for model in self.models:
+            breaker = self.breakers[model]
+            if not breaker.allow():
+                continue
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    self._backoff(attempt - 1)
+                iterator = self.backend.stream(prompt, model, self.timeout)
+                try:
+                    first = next(iterator)
+                except StopIteration:
+                    last_error = LLMError("Empty response")
+                    breaker.record_failure()
+                    continue
+                except Exception as e:
+                    if not is_retryable(e):
+                        self.stats["rejected"] += 1
+                        raise _request_error(e) from e
+                    last_error = e
+                    breaker.record_failure()
+                    if not breaker.allow():
+                        break
+                    continue
+                breaker.record_success()
+                yield first
+                try:
+                    yield from iterator
+                except Exception as e:
+                    if is_retryable(e):
+                        breaker.record_failure()
+                    raise LLMError(f"Response interrupted: {e}") from e
+                return
+        raise LLMUnavailableError(f"The assistant is temporarily unavailable ({last_error or 'circuit open'}).")
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ResilientLLM()
+        return _client
+
@@ -0,0 +1,411 @@
+"""
+Background database maintenance: retention/archiving, incremental vacuum,
+ANALYZE and online backups.
+
+Cold rows are moved in small batches into a separate archive database as
+compressed JSON, so the live tables (and the page cache) only hold recent
+data. Backups use the sqlite online backup API in short steps, which lets
+writers keep going while a copy is taken, and add a tar of the extracted
+texts and parsed tables stored outside the DB; they replace the hand-made
+``backup.sql`` / ``recovered.sql`` dumps.
+
+Run everything once:   python -m src.maintenance run
+Run a single job:      python -m src.maintenance archive|vacuum|backup
+Export archived rows:  python -m src.maintenance export <table> [user_email]
+
+Incremental vacuum needs auto_vacuum=INCREMENTAL. New databases are created
+that way; convert an existing one once, with the app stopped:
+                       python -m src.maintenance enable-incremental-vacuum
+"""
+import json
+import os
+import sqlite3
+import sys
+import tarfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from src import db, tabular, text_store
+from src.compression import compress_bytes, decompress_bytes, unpack_text
+from src.shared_cache import get_cache
+
+ARCHIVE_DB_FILE = os.environ.get("ARCHIVE_DB_FILE", os.path.join("data", "archive.db"))
+BACKUP_DIR = os.environ.get("BACKUP_DIR", os.path.join("data", "backups"))
+BACKUP_KEEP = int(os.environ.get("BACKUP_KEEP", 7))
+
+# Days to keep rows in the live database, per table. 0 disables archiving for that table.
+RETENTION_DAYS = {
+    "chats": int(os.environ.get("RETENTION_CHATS_DAYS", 180)),
+    "uploaded_files": int(os.environ.get("RETENTION_UPLOADED_FILES_DAYS", 365)),
+    "email_logs": int(os.environ.get("RETENTION_EMAIL_LOGS_DAYS", 30)),
+}
+
+ARCHIVE_BATCH_SIZE = 500
+VACUUM_PAGES_PER_RUN = 2000
+BACKUP_PAGES_PER_STEP = 256
+
+
+def _archive_connection():
+    os.makedirs(os.path.dirname(ARCHIVE_DB_FILE) or ".", exist_ok=True)
+    conn = sqlite3.connect(ARCHIVE_DB_FILE, timeout=30)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS archived_rows (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source_table TEXT NOT NULL,
+        source_id INTEGER NOT NULL,
+        user_email TEXT,
+        row_timestamp TEXT,
+        archived_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        payload BLOB NOT NULL,
+        UNIQUE (source_table, source_id)
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_archived_user ON archived_rows (source_table, user_email)")
+    conn.commit()
+    return conn
+
+
+def _row_user(table, row):
+    if table == "email_logs":
+        return row["recipient"]
+    return row["user_email"]
+
+
+def _row_payload(row, stored_text=None):
+    # Compressed columns are unpacked first so the archive holds plain JSON.
+    values = {key: unpack_text(row[key]) for key in row.keys()}
+    if stored_text is not None:
+        values["extracted_text"] = stored_text
+    return json.dumps(values, default=str).encode("utf-8")
+
+
+def archive_table(table, retention_days, batch_size=ARCHIVE_BATCH_SIZE, pause=0.05):
+    """
+    Move rows older than ``retention_days`` from ``table`` into the archive DB.
+
+    Rows are read in id order (ids grow with timestamps), so each batch is a
+    cheap range scan; every batch is its own short transaction and we pause
+    between batches to let app writes through. Inserting into the archive is
+    idempotent, so a crash between the archive write and the delete only
+    leaves rows to be retried on the next run.
+    """
+    if retention_days <= 0:
+        return 0
+
+    conn = db.get_connection()
+    archive = _archive_connection()
+    cutoff = conn.execute("SELECT datetime('now', ?)", (f"-{retention_days} days",)).fetchone()[0]
+    moved = 0
+    last_id = 0
+
+    try:
+        while True:
+            rows = conn.execute(
+                f"SELECT * FROM {table} WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+            ).fetchall()
+            cold = [row for row in rows if row["timestamp"] and row["timestamp"] < cutoff]
+            if not cold:
+                break
+
+            # Uploaded files' text lives in the text store; fold it back into the archived row.
+            cursor = conn.cursor()
+            stored = {}
+            if table == "uploaded_files":
+                stored = {row["id"]: text_store.read_text(cursor, row["id"]) for row in cold}
+
+            archive.executemany("""
+                INSERT OR IGNORE INTO archived_rows (source_table, source_id, user_email, row_timestamp, payload)
+                VALUES (?, ?, ?, ?, ?)
+            """, [
+                (table, row["id"], _row_user(table, row), row["timestamp"],
+                 compress_bytes(_row_payload(row, stored.get(row["id"]))))
+                for row in cold
+            ])
+            archive.commit()
+
+            ids = [row["id"] for row in cold]
+            conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(i,) for i in ids])
+            text_paths = [text_store.delete_text(cursor, i) for i in stored]
+            # Archived files are no longer offered as chat context, so their parsed tables are dropped.
+            table_dirs = [tabular.delete_file_tables(cursor, i) for i in stored]
+            if table != "email_logs":
+                users = sorted({_row_user(table, row) for row in cold})
+                conn.executemany(
+                    "UPDATE data_versions SET version = version + 1 WHERE user_email = ?",
+                    [(u,) for u in users],
+                )
+            conn.commit()
+            for path in filter(None, text_paths):
+                text_store.remove_text_file(path)
+            for directory in table_dirs:
+                tabular.discard_table_dir(directory)
+
+            moved += len(cold)
+            last_id = ids[-1]
+            # A partially cold batch means we've reached rows that are still within retention.
+            if len(cold) < len(rows):
+                break
+            time.sleep(pause)
+    finally:
+        archive.close()
+        conn.close()
+
+    return moved
+
+
+def archive_cold_rows():
+    return {table: archive_table(table, days) for table, days in RETENTION_DAYS.items()}
+
+
+def get_archived_rows(source_table, user_email=None, limit=100):
+    """
+    Read archived rows back as dicts (newest first), e.g. for exports or support requests.
+    """
+    archive = _archive_connection()
+    if user_email:
+        cur = archive.execute("""
+            SELECT payload FROM archived_rows WHERE source_table = ? AND user_email = ?
+            ORDER BY source_id DESC LIMIT ?
+        """, (source_table, user_email, limit))
+    else:
+        cur = archive.execute("""
+            SELECT payload FROM archived_rows WHERE source_table = ?
+            ORDER BY source_id DESC LIMIT ?
+        """, (source_table, limit))
+    rows = [json.loads(decompress_bytes(payload)) for (payload,) in cur.fetchall()]
+    archive.close()
+    return rows
+
+
+def attach_archive(conn, schema="archive"):
+    """
+    ATTACH the archive DB to ``conn`` so it can be read in the same transaction
+    as the live tables. Call detach_archive before returning a pooled connection.
+    """
+    _archive_connection().close()  # creates the archive and its table on first use
+    conn.execute("ATTACH DATABASE ? AS " + schema, (ARCHIVE_DB_FILE,))
+
+
+def detach_archive(conn, schema="archive"):
+    conn.execute("DETACH DATABASE " + schema)
+
+
+def count_archived_by_user(cursor, schema="archive"):
+    """
+    {(source_table, user_email): archived row count}, used to reconcile lifetime
+    counters; the archive must be attached to ``cursor``'s connection. Rows that
+    are still live as well (an archive batch between its archive write and its
+    delete, or one that crashed there) are left out so they aren't counted twice.
+    """
+    counts = {}
+    for table in ("chats", "uploaded_files"):
+        cursor.execute(f"""
+            SELECT a.user_email, COUNT(*) FROM {schema}.archived_rows AS a
+            WHERE a.source_table = ? AND a.user_email IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM main.{table} AS t WHERE t.id = a.source_id)
+            GROUP BY a.user_email
+        """, (table,))
+        for email, count in cursor.fetchall():
+            counts[table, email] = count
+    return counts
+
+
+def _check_user_stats():
+    from src.analytics import check_user_stats
+    return check_user_stats(repair=True)
+
+
+def enable_incremental_vacuum():
+    """
+    Convert an existing database to auto_vacuum=INCREMENTAL. This needs a full
+    VACUUM, which rewrites the file under an exclusive lock, so it is an
+    offline step (run it with the app stopped), never a scheduled job.
+    New databases get the setting from create_tables.
+    """
+    conn = db.get_connection()
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return True
+    finally:
+        conn.close()
+
+
+def vacuum_and_analyze(max_pages=VACUUM_PAGES_PER_RUN):
+    """
+    Return free pages to the OS a bit at a time and refresh planner statistics.
+    Databases not yet converted with enable_incremental_vacuum are only analyzed.
+    """
+    conn = db.get_connection()
+    try:
+        freed = 0
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            freed = min(conn.execute("PRAGMA freelist_count").fetchone()[0], max_pages)
+            conn.execute(f"PRAGMA incremental_vacuum({int(max_pages)})")
+        else:
+            print("[maintenance] auto_vacuum is off; run `python -m src.maintenance enable-incremental-vacuum` "
+                  "while the app is stopped to reclaim free pages.")
+        conn.execute("ANALYZE")
+        conn.commit()
+        return freed
+    finally:
+        conn.close()
+
+
+def _backup_files(tar_path):
+    """
+    Archive the extracted texts and parsed tables that live next to the DB, as
+    ``texts/...`` and ``tables/...``. Uncommitted ``.tmp`` texts and upload
+    staging directories are skipped. Returns the number of files added.
+    """
+    def skip(info):
+        name = os.path.basename(info.name)
+        return None if name.endswith(".tmp") or name.startswith("staging-") else info
+
+    with tarfile.open(tar_path, "w") as tar:
+        for arcname, directory in (("texts", text_store.TEXT_DIR), ("tables", tabular.TABLES_DIR)):
+            if not os.path.isdir(directory):
+                continue
+            tar.add(directory, arcname=arcname, filter=skip)
+        added = sum(1 for member in tar.getmembers() if member.isfile())
+    return added
+
+
+def backup_database(dest_dir=None, keep=None, pages=BACKUP_PAGES_PER_STEP, sleep=0.01):
+    """
+    Take an online, consistent copy of the live DB, plus a tar of the files it
+    points to (data/texts and data/tables), and prune old backups. Texts and
+    tables are written once per file id, so copying them right after the DB
+    snapshot covers every file the snapshot references. Restore by copying
+    the .db back and extracting the .files.tar into data/.
+    """
+    dest_dir = BACKUP_DIR if dest_dir is None else dest_dir
+    keep = BACKUP_KEEP if keep is None else keep
+    os.makedirs(dest_dir, exist_ok=True)
+    # Microseconds keep names in time order for pruning; the random suffix keeps two
+    # backups started together (a forced run and the scheduler) from sharing a name.
+    stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S-%f")
+    base = os.path.join(
+        dest_dir, f"{os.path.splitext(os.path.basename(db.DB_FILE))[0]}-{stamp}-{uuid.uuid4().hex[:8]}"
+    )
+    dest_path = base + ".db"
+    if os.path.exists(dest_path):
+        raise FileExistsError(dest_path)
+
+    src = sqlite3.connect(db.DB_FILE, timeout=30)
+    dest = sqlite3.connect(dest_path)
+    try:
+        src.backup(dest, pages=pages, sleep=sleep)
+    finally:
+        dest.close()
+        src.close()
+    _backup_files(base + ".files.tar")
+
+    backups = sorted(
+        os.path.join(dest_dir, name) for name in os.listdir(dest_dir) if name.endswith(".db")
+    )
+    for old in backups[:-keep] if keep else []:
+        os.remove(old)
+        files = old[:-len(".db")] + ".files.tar"
+        if os.path.exists(files):
+            os.remove(files)
+    return dest_path
+
+
+# === Scheduler ===
+
+# (job name, interval in seconds, callable). Other modules may append to this list.
+JOBS = [
+    ("archive", 60 * 60, archive_cold_rows),
+    ("vacuum", 24 * 60 * 60, vacuum_and_analyze),
+    ("backup", 24 * 60 * 60, backup_database),
+    ("cache_purge", 60 * 60, lambda: get_cache().purge()),
+    ("token_sweep", 10 * 60, db.purge_expired_tokens),
+    ("text_store", 60 * 60, db.migrate_inline_texts),
+    ("stats_check", 24 * 60 * 60, _check_user_stats),
+]
+
+
+def _claim_job(name, interval):
+    """
+    Atomically mark ``name`` as started if it is due. Only one process wins,
+    so running several app workers doesn't run the same job concurrently.
+    """
+    now = int(time.time())
+    conn = db.get_connection()
+    try:
+        conn.execute("INSERT OR IGNORE INTO maintenance_state (job, last_run) VALUES (?, 0)", (name,))
+        cur = conn.execute(
+            "UPDATE maintenance_state SET last_run = ? WHERE job = ? AND last_run <= ?",
+            (now, name, now - interval),
+        )
+        conn.commit()
+        return cur.rowcount == 1
+    finally:
+        conn.close()
+
+
+def run_due_jobs(force=False):
+    results = {}
+    for name, interval, job in JOBS:
+        if not force and not _claim_job(name, interval):
+            continue
+        try:
+            results[name] = job()
+            print(f"[maintenance] {name}: {results[name]}")
+        except Exception as e:
+            print(f"[maintenance] {name} failed: {e}")
+    return results
+
+
+_scheduler_lock = threading.Lock()
+_scheduler_thread = None
+
+
+def start_scheduler(poll_seconds=300):
+    """
+    Start a daemon thread that runs due jobs every ``poll_seconds``. Safe to call repeatedly.
+    The first check happens one interval after start, so app startup and the
+    first page load never wait behind maintenance work.
+    """
+    global _scheduler_thread
+    with _scheduler_lock:
+        if _scheduler_thread and _scheduler_thread.is_alive():
+            return _scheduler_thread
+
+        def loop():
+            while True:
+                time.sleep(poll_seconds)
+                run_due_jobs()
+
+        _scheduler_thread = threading.Thread(target=loop, name="db-maintenance", daemon=True)
+        _scheduler_thread.start()
+        return _scheduler_thread
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "run"
+    db.safe_initialize()
+    if command == "run":
+        run_due_jobs(force=True)
+    elif command == "archive":
+        print(archive_cold_rows())
+    elif command == "vacuum":
+        print(f"Freed up to {vacuum_and_analyze()} pages.")
+    elif command == "backup":
+        print(f"Backup written to {backup_database()}")
+    elif command == "enable-incremental-vacuum":
+        converted = enable_incremental_vacuum()
+        print("Converted to auto_vacuum=INCREMENTAL." if converted else "Already incremental.")
+    elif command == "export" and len(sys.argv) > 2:
+        # Archived rows as JSON lines, e.g. for a user's data request.
+        user_email = sys.argv[3] if len(sys.argv) > 3 else None
+        for row in get_archived_rows(sys.argv[2], user_email, limit=-1):
+            print(json.dumps(row, default=str))
+    else:
+        print(__doc__)
+        sys.exit(1)
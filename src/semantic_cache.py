@@ -0,0 +1,251 @@
+"""
+Near-duplicate prompt cache.
+
+Prompts are normalized and embedded, and a new prompt whose cosine
+similarity to a cached one is above ``threshold`` reuses that answer
+instead of calling Gemini. The index is a NumPy matrix searched by brute
+force (a few thousand entries per scope is a single matrix-vector product),
+with least-recently-used eviction. Entries are scoped per user by default
+so one user's answers are never served to another; set
+SEMANTIC_CACHE_SCOPE=global to share them. A question asked with file
+context is scoped to (a hash of) that context as well.
+
+SEMANTIC_CACHE_EMBEDDER picks the embedder (empty disables the cache):
+    keywords - offline content-word embedder (default)
+    gemini   - Gemini text-embedding model
+
+KeywordEmbedder only matches rewordings that keep the same content words
+in the same order (filler, question phrasing, contractions, plurals); it
+never guesses at synonyms, so it misses many paraphrases but doesn't serve
+"... 2021" for "... 2022". HashingEmbedder (word and character n-gram
+hashing) is kept for tests and benchmarks only: it scores such near-misses
+above 0.9. Each embedder carries the threshold checked for it with
+``python -m benchmarks.semantic_cache``; SEMANTIC_CACHE_THRESHOLD overrides it.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+
+SEMANTIC_CACHE_THRESHOLD = os.environ.get("SEMANTIC_CACHE_THRESHOLD")  # unset: the embedder's own
+SEMANTIC_CACHE_SCOPE = os.environ.get("SEMANTIC_CACHE_SCOPE", "user")
+SEMANTIC_CACHE_EMBEDDER = os.environ.get("SEMANTIC_CACHE_EMBEDDER", "keywords")  # empty: cache disabled
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", 2000))
+
+
+def normalize_prompt(text):
+    text = text.lower().strip()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _hash_features(features, dim):
+    import numpy as np
+
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in features:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dim
+        vector[bucket] += weight if digest[4] & 1 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class HashingEmbedder:
+    """
+    Bag of word unigrams and character trigrams, hashed into ``dim`` buckets
+    and L2-normalized. Cheap and deterministic, for tests and benchmarks; it
+    is lexical, so it can't be selected through SEMANTIC_CACHE_EMBEDDER.
+    """
+    name = "hashing"
+    threshold = 0.95
+
+    def __init__(self, dim=1024):
+        self.dim = dim
+
+    def embed(self, text):
+        # Whole words carry more meaning than trigrams, so they weigh double.
+        features = [(word, 2.0) for word in text.split()]
+        features += [(text[i:i + 3], 1.0) for i in range(max(0, len(text) - 2))]
+        return _hash_features(features, self.dim)
+
+
+# Words that only shape the question. Negations and directions (not, no, on, off,
+# to, from, before, after, ...) are deliberately missing: they change the answer.
+_FILLER_WORDS = frozenset("""
+    a an the is are was were be been being am do does did of in for at by with about
+    what how i me my we our you your it its this that these those there here and or
+    can could would will should shall may might must please tell give show explain
+    describe explanation description s ll re ve d m
+""".split())
+# Same meaning, different wording; "t" is what's left of "don't" after normalizing.
+_CANONICAL_WORDS = {"t": "not", "many": "number", "whats": "what"}
+
+
+class KeywordEmbedder:
+    """
+    Content words (filler dropped, plurals folded) and the bigrams of
+    consecutive content words, hashed into ``dim`` buckets. Offline and
+    deterministic. A changed or reordered content word costs relatively
+    less in a long question, so the threshold only lets through prompts
+    whose content words match in order: "miles to kilometers" stays apart
+    from "kilometers to miles", and "revenue ... 2021" from "... 2022".
+    """
+    name = "keywords"
+    threshold = 0.99  # see python -m benchmarks.semantic_cache keywords
+
+    def __init__(self, dim=1024):
+        self.dim = dim
+
+    @staticmethod
+    def content_words(text):
+        words = []
+        for word in text.split():
+            word = _CANONICAL_WORDS.get(word, word)
+            if word in _FILLER_WORDS:
+                continue
+            if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+                word = word[:-1]
+            words.append(word)
+        return words
+
+    def embed(self, text):
+        words = self.content_words(text)
+        features = [(word, 1.0) for word in words]
+        features += [(f"{a} {b}", 1.0) for a, b in zip(words, words[1:])]
+        return _hash_features(features, self.dim)
+
+
+class GeminiEmbedder:
+    name = "gemini"
+    threshold = 0.95
+
+    def __init__(self, model="models/text-embedding-004"):
+        self.model = model
+
+    def embed(self, text):
+        import numpy as np
+        import google.generativeai as genai
+        from src.helper import get_gemini_model
+
+        get_gemini_model()  # makes sure genai.configure() has run
+        vector = np.asarray(genai.embed_content(model=self.model, content=text)["embedding"], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+# Embedders that can be enabled for the app; each needs its threshold checked first.
+_EMBEDDERS = {"keywords": KeywordEmbedder, "gemini": GeminiEmbedder}
+
+
+class _ScopeIndex:
+    def __init__(self, dim, capacity):
+        import numpy as np
+
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.entries = [None] * capacity  # (normalized prompt, response, original latency)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.size = 0
+
+    def search(self, query):
+        if not self.size:
+            return None, 0.0
+        scores = self.vectors[:self.size] @ query
+        best = int(scores.argmax())
+        return best, float(scores[best])
+
+    def add(self, vector, entry):
+        if self.size < len(self.entries):
+            slot = self.size
+            self.size += 1
+        else:
+            slot = int(self.last_used.argmin())
+        self.vectors[slot] = vector
+        self.entries[slot] = entry
+        self.last_used[slot] = time.monotonic()
+
+
+class SemanticCache:
+    def __init__(self, embedder=None, threshold=None, scope=SEMANTIC_CACHE_SCOPE,
+                 max_entries=SEMANTIC_CACHE_MAX_ENTRIES):
+        self.embedder = embedder or _EMBEDDERS[SEMANTIC_CACHE_EMBEDDER]()
+        if threshold is None:
+            threshold = float(SEMANTIC_CACHE_THRESHOLD or self.embedder.threshold)
+        self.threshold = threshold
+        self.scope = scope
+        self.max_entries = max_entries
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self.metrics = {"lookups": 0, "hits": 0, "latency_saved_s": 0.0, "lookup_time_s": 0.0}
+
+    def _scope_key(self, user, context=None):
+        key = user if self.scope == "user" and user else "__global__"
+        if context:
+            key += ":" + hashlib.sha256(context.encode("utf-8")).hexdigest()[:16]
+        return key
+
+    def lookup(self, prompt, user=None, context=None):
+        """
+        Return a cached response for a prompt similar enough to ``prompt`` that
+        was asked with the same ``context``, or None.
+        """
+        start = time.perf_counter()
+        normalized = normalize_prompt(prompt)
+        vector = self.embedder.embed(normalized)
+        with self._lock:
+            self.metrics["lookups"] += 1
+            index = self._indexes.get(self._scope_key(user, context))
+            response = None
+            if index is not None:
+                slot, score = index.search(vector)
+                if slot is not None and score >= self.threshold:
+                    _, response, latency = index.entries[slot]
+                    index.last_used[slot] = time.monotonic()
+                    self.metrics["hits"] += 1
+                    self.metrics["latency_saved_s"] += latency
+            self.metrics["lookup_time_s"] += time.perf_counter() - start
+        return response
+
+    def store(self, prompt, response, user=None, latency=0.0, context=None):
+        normalized = normalize_prompt(prompt)
+        vector = self.embedder.embed(normalized)
+        with self._lock:
+            key = self._scope_key(user, context)
+            if key not in self._indexes:
+                self._indexes[key] = _ScopeIndex(len(vector), self.max_entries)
+            index = self._indexes[key]
+            slot, score = index.search(vector)
+            if slot is not None and score >= 0.999:
+                index.entries[slot] = (normalized, response, latency)
+                index.last_used[slot] = time.monotonic()
+            else:
+                index.add(vector, (normalized, response, latency))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.metrics["lookups"]
+            return {
+                **self.metrics,
+                "hit_rate": self.metrics["hits"] / lookups if lookups else 0.0,
+                "avg_lookup_ms": self.metrics["lookup_time_s"] * 1000 / lookups if lookups else 0.0,
+                "entries": sum(index.size for index in self._indexes.values()),
+            }
+
+
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    """
+    The process-wide semantic cache, or None when no embedder is configured.
+    """
+    global _semantic_cache
+    if SEMANTIC_CACHE_EMBEDDER not in _EMBEDDERS:
+        return None
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            _semantic_cache = SemanticCache()
+        return _semantic_cache
+
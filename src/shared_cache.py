@@ -0,0 +1,183 @@
+"""
+Two-tier cache shared by every app process on the machine.
+
+L1 is a small in-process LRU with a short TTL. L2 is a SQLite database in
+WAL mode, so any number of Streamlit workers (see src/deploy.py) can read
+concurrently while writes are serialized by SQLite's own locking; a busy
+timeout makes concurrent writers wait instead of failing. Values are JSON,
+compressed above the usual threshold.
+
+Namespaces used by the app:
+    llm          - Gemini responses keyed by prompt hash
+    translation  - googletrans results
+    profile      - get_user() rows without the password or token columns
+                   (invalidated on every user update; unknown emails aren't cached)
+    extraction   - text extracted from uploaded PDFs / text files
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from src.compression import pack_text, unpack_text
+
+SHARED_CACHE_FILE = os.environ.get("SHARED_CACHE_FILE", os.path.join("data", "shared_cache.db"))
+L1_MAX_ENTRIES = 1024
+L1_TTL_SECONDS = 5
+MAX_ENTRIES_PER_NAMESPACE = 50_000
+
+DEFAULT_TTLS = {
+    "llm": 24 * 60 * 60,
+    "translation": 7 * 24 * 60 * 60,
+    "profile": 10 * 60,
+    "extraction": 30 * 24 * 60 * 60,
+}
+
+
+def make_key(*parts):
+    return hashlib.sha256("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+class SharedCache:
+    def __init__(self, path=None, l1_max_entries=L1_MAX_ENTRIES, l1_ttl=L1_TTL_SECONDS):
+        self.path = path or SHARED_CACHE_FILE
+        self.l1_max_entries = l1_max_entries
+        self.l1_ttl = l1_ttl
+        self._l1 = OrderedDict()
+        self._l1_lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = {"l1": 0, "l2": 0, "miss": 0}
+
+    # --- L2 (SQLite) ---
+
+    def _connection(self):
+        # One connection per thread and per process (connections must not cross a fork).
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS cache_entries (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value BLOB,
+            expires_at INTEGER,
+            PRIMARY KEY (namespace, key)
+        ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expiry ON cache_entries (expires_at)")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    # --- L1 (in-process) ---
+
+    def _l1_get(self, full_key):
+        with self._l1_lock:
+            entry = self._l1.get(full_key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.time():
+                del self._l1[full_key]
+                return None
+            self._l1.move_to_end(full_key)
+            return entry
+
+    def _l1_set(self, full_key, value, ttl):
+        expires = time.time() + min(self.l1_ttl, ttl if ttl else self.l1_ttl)
+        with self._l1_lock:
+            self._l1[full_key] = (value, expires)
+            self._l1.move_to_end(full_key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    # --- Public API ---
+
+    def get(self, namespace, key, default=None):
+        full_key = (namespace, key)
+        entry = self._l1_get(full_key)
+        if entry is not None:
+            self.hits["l1"] += 1
+            return entry[0]
+
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            self.hits["miss"] += 1
+            return default
+
+        value = json.loads(unpack_text(row[0]))
+        remaining = row[1] - time.time() if row[1] is not None else None
+        self._l1_set(full_key, value, remaining)
+        self.hits["l2"] += 1
+        return value
+
+    def set(self, namespace, key, value, ttl=None):
+        ttl = DEFAULT_TTLS.get(namespace) if ttl is None else ttl
+        expires_at = int(time.time() + ttl) if ttl else None
+        self._connection().execute("""
+            INSERT INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+        """, (namespace, key, pack_text(json.dumps(value)), expires_at))
+        self._l1_set((namespace, key), value, ttl)
+
+    def delete(self, namespace, key):
+        with self._l1_lock:
+            self._l1.pop((namespace, key), None)
+        self._connection().execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+
+    def get_or_compute(self, namespace, key, compute, ttl=None):
+        """
+        Return the cached value or compute and store it. Two processes missing
+        at the same time both compute; the last write wins, which is fine for
+        the deterministic-enough values we cache.
+        """
+        missing = object()
+        value = self.get(namespace, key, missing)
+        if value is missing:
+            value = compute()
+            self.set(namespace, key, value, ttl)
+        return value
+
+    def purge(self, max_entries_per_namespace=MAX_ENTRIES_PER_NAMESPACE):
+        """
+        Drop expired entries, then trim each namespace to its size bound
+        (soonest-to-expire first). Run periodically by the maintenance scheduler.
+        """
+        conn = self._connection()
+        removed = conn.execute(
+            "DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at < ?", (int(time.time()),)
+        ).rowcount
+        namespaces = [row[0] for row in conn.execute("SELECT DISTINCT namespace FROM cache_entries")]
+        for namespace in namespaces:
+            removed += conn.execute("""
+                DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+                    SELECT key FROM cache_entries WHERE namespace = ?
+                    ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (namespace, namespace, max_entries_per_namespace)).rowcount
+        return removed
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SharedCache()
+        return _cache
@@ -0,0 +1,427 @@
+"""
+Columnar ingestion for CSV and spreadsheet uploads.
+
+Tables are read in chunks (pandas' chunked CSV reader, openpyxl's
+read-only row iterator for every sheet) and streamed into one Parquet file
+per sheet under ``data/tables/<file_id>/``. Per-column statistics are
+accumulated while writing, so the chat prompt can include an aggregate
+summary or a sampled preview without ever loading the whole table.
+"""
+import json
+import os
+import random
+import shutil
+import uuid
+
+from src.db import get_connection
+
+TABLES_DIR = os.environ.get("TABLES_DIR", os.path.join("data", "tables"))
+CHUNK_ROWS = int(os.environ.get("TABLE_CHUNK_ROWS", 100_000))
+PREVIEW_ROWS = 20
+
+CSV_TYPES = ["text/csv", "application/csv", "text/comma-separated-values"]
+EXCEL_TYPES = ["application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "application/vnd.ms-excel"]
+
+
+def table_kind(uploaded_file):
+    """
+    Return "csv", "excel" or None. Browsers report CSV as application/vnd.ms-excel
+    on Windows, so the extension wins over the MIME type.
+    """
+    name = (getattr(uploaded_file, "name", "") or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".xlsx", ".xlsm")):
+        return "excel"
+    if uploaded_file.type in CSV_TYPES:
+        return "csv"
+    if uploaded_file.type in EXCEL_TYPES:
+        return "excel"
+    return None
+
+
+# === Chunk readers ===
+
+def _csv_chunks(uploaded_file):
+    import pandas as pd
+    yield from pd.read_csv(uploaded_file, chunksize=CHUNK_ROWS, low_memory=False)
+
+
+def _excel_sheets(uploaded_file):
+    """
+    Yield (sheet_name, chunk iterator) for every sheet, reading rows lazily.
+    """
+    import pandas as pd
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(uploaded_file, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            columns = _unique_columns(header)
+
+            def chunks(rows=rows, columns=columns):
+                batch = []
+                for row in rows:
+                    if row is None or all(value is None for value in row):
+                        continue
+                    batch.append(row[:len(columns)])
+                    if len(batch) >= CHUNK_ROWS:
+                        yield pd.DataFrame(batch, columns=columns)
+                        batch = []
+                if batch:
+                    yield pd.DataFrame(batch, columns=columns)
+
+            yield sheet.title, chunks()
+    finally:
+        workbook.close()
+
+
+def _unique_columns(header):
+    columns, seen = [], {}
+    for i, name in enumerate(header):
+        name = str(name) if name is not None else f"column_{i + 1}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}_{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+
+# === Parquet writer with running stats ===
+
+def _new_stats(kind):
+    return {"type": kind, "count": 0, "nulls": 0, "min": None, "max": None, "sum": 0.0}
+
+
+def _update_stats(stats, series):
+    import pandas as pd
+
+    stats["nulls"] += int(series.isna().sum())
+    values = series.dropna()
+    stats["count"] += int(len(values))
+    if values.empty:
+        return
+    if stats["type"] in ("integer", "number"):
+        stats["sum"] += float(values.sum())
+        low, high = float(values.min()), float(values.max())
+    elif stats["type"] == "datetime":
+        low, high = pd.Timestamp(values.min()).isoformat(), pd.Timestamp(values.max()).isoformat()
+    elif stats["type"] == "bool":
+        low, high = bool(values.min()), bool(values.max())
+    else:
+        lengths = values.astype(str).str.len()
+        low, high = int(lengths.min()), int(lengths.max())
+    stats["min"] = low if stats["min"] is None else min(stats["min"], low)
+    stats["max"] = high if stats["max"] is None else max(stats["max"], high)
+
+
+def _column_kind(series):
+    import pandas as pd
+
+    # A column with no values yet is typed by the first chunk that has some.
+    if series.isna().all():
+        return "empty"
+    if pd.api.types.is_bool_dtype(series):
+        return "bool"
+    if pd.api.types.is_integer_dtype(series):
+        return "integer"
+    if pd.api.types.is_numeric_dtype(series):
+        return "number"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    return "text"
+
+
+_BOOL_VALUES = {"true": True, "false": False, "1": True, "0": False}
+
+
+def _to_bool(value):
+    # str() covers Python and NumPy bools ("True"/"False") as well as text and 0/1.
+    return _BOOL_VALUES.get(str(value).strip().lower())
+
+
+def _coerce(series, kind):
+    """
+    Convert ``series`` to the nullable dtype for ``kind``. Never raises:
+    values that don't fit come back as nulls.
+    """
+    import pandas as pd
+
+    try:
+        if kind == "integer":
+            numbers = pd.to_numeric(series, errors="coerce")
+            return numbers.where(numbers.isna() | (numbers % 1 == 0)).astype("Int64")
+        if kind == "number":
+            return pd.to_numeric(series, errors="coerce").astype("float64")
+        if kind == "datetime":
+            return pd.to_datetime(series, errors="coerce")
+        if kind == "bool":
+            return series.map(_to_bool, na_action="ignore").astype("boolean")
+    except (TypeError, ValueError):
+        return pd.Series(None, index=series.index, dtype="object")
+    if kind == "empty":
+        return pd.Series(None, index=series.index, dtype="object")
+    return series.astype("string")
+
+
+def _widen(kind, series):
+    import pandas as pd
+
+    if kind == "empty":
+        return _column_kind(series)
+    if kind == "integer" and pd.to_numeric(series, errors="coerce").notna().sum() == series.notna().sum():
+        return "number"
+    return "text"
+
+
+def _normalize_chunk(df, kinds):
+    """
+    Coerce a chunk to the current column kinds so every row group shares one
+    schema. A column whose values don't fit its kind is widened (empty ->
+    detected kind, integer -> number, anything else -> text) instead of
+    losing data; ``kinds`` is updated and the widened columns are returned.
+    """
+    widened = set()
+    for column, kind in kinds.items():
+        if column not in df:
+            df[column] = None
+        series = df[column]
+        coerced = _coerce(series, kind)
+        while coerced.notna().sum() < series.notna().sum() and kind != "text":
+            kind = _widen(kind, series)
+            coerced = _coerce(series, kind)
+        if kind != kinds[column]:
+            kinds[column] = kind
+            widened.add(column)
+        df[column] = coerced
+    return df[list(kinds)], widened
+
+
+def _rewrite_widened(old_path, new_path, schema, columns, stats):
+    """
+    Copy the row groups written so far into a new file with ``schema`` (the
+    widened columns cast to their new type), recomputing those columns'
+    stats. Returns the open writer for the new file.
+    """
+    import pyarrow.parquet as pq
+
+    old = pq.ParquetFile(old_path)
+    writer = pq.ParquetWriter(new_path, schema, compression="zstd")
+    for column in columns:
+        stats[column] = _new_stats(stats[column]["type"])
+    for index in range(old.num_row_groups):
+        table = old.read_row_group(index).cast(schema)
+        writer.write_table(table)
+        for column in columns:
+            _update_stats(stats[column], table.column(column).to_pandas())
+    os.remove(old_path)
+    return writer
+
+
+def _write_parquet(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    kinds, stats = {}, {}
+    rows = 0
+    current_path, rewrites = path, 0
+    try:
+        for df in chunks:
+            if writer is None:
+                df.columns = _unique_columns(df.columns)
+                kinds = {column: _column_kind(df[column]) for column in df.columns}
+                stats = {column: _new_stats(kind) for column, kind in kinds.items()}
+            df, widened = _normalize_chunk(df, kinds)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+
+            if writer is None:
+                writer = pq.ParquetWriter(current_path, table.schema, compression="zstd")
+            elif widened:
+                # Parquet files can't change schema mid-write, so earlier row groups are copied over.
+                schema = pa.schema([
+                    table.schema.field(name) if name in widened else writer.schema.field(name)
+                    for name in writer.schema.names
+                ])
+                writer.close()
+                rewrites += 1
+                new_path = f"{path}.{rewrites}"
+                for column in widened:
+                    stats[column]["type"] = kinds[column]
+                writer = _rewrite_widened(current_path, new_path, schema, widened, stats)
+                current_path = new_path
+
+            for column in kinds:
+                _update_stats(stats[column], df[column])
+            writer.write_table(table.cast(writer.schema))
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+        if current_path != path and os.path.exists(current_path):
+            os.replace(current_path, path)
+
+    for column_stats in stats.values():
+        if column_stats["type"] in ("integer", "number") and column_stats["count"]:
+            column_stats["mean"] = column_stats["sum"] / column_stats["count"]
+    return rows, stats
+
+
+def ingest_tables(uploaded_file):
+    """
+    Stream a CSV/XLSX upload into Parquet files in a staging directory.
+    Returns a list of table metadata dicts; pass them to register_file_tables
+    once the file row exists, or to discard_tables.
+    """
+    kind = table_kind(uploaded_file)
+    if kind is None:
+        raise ValueError("Unsupported file type")
+
+    staging = os.path.join(TABLES_DIR, f"staging-{uuid.uuid4().hex}")
+    os.makedirs(staging, exist_ok=True)
+
+    if kind == "csv":
+        sheets = [("data", _csv_chunks(uploaded_file))]
+    else:
+        sheets = _excel_sheets(uploaded_file)
+
+    tables, finished = [], False
+    try:
+        for index, (sheet_name, chunks) in enumerate(sheets):
+            path = os.path.join(staging, f"{index:03d}.parquet")
+            rows, stats = _write_parquet(chunks, path)
+            if not stats:
+                continue
+            tables.append({"sheet_name": sheet_name, "path": path, "n_rows": rows, "stats": stats})
+        finished = True
+    finally:
+        # On errors (an empty CSV raises EmptyDataError) or when no sheet had data, nothing is handed back.
+        if not (finished and tables):
+            shutil.rmtree(staging, ignore_errors=True)
+    return tables
+
+
+def discard_tables(tables):
+    for directory in {os.path.dirname(table["path"]) for table in tables}:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def register_file_tables(file_id, tables):
+    """
+    Move staged Parquet files under data/tables/<file_id>/ and record them in file_tables.
+    """
+    if not tables:
+        return []
+    final_dir = os.path.join(TABLES_DIR, str(file_id))
+    staging = os.path.dirname(tables[0]["path"])
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(staging, final_dir)
+
+    registered = []
+    conn = get_connection()
+    for table in tables:
+        path = os.path.join(final_dir, os.path.basename(table["path"]))
+        conn.execute("""
+            INSERT INTO file_tables (file_id, sheet_name, path, n_rows, stats_json)
+            VALUES (?, ?, ?, ?, ?)
+        """, (file_id, table["sheet_name"], path, table["n_rows"], json.dumps(table["stats"])))
+        registered.append({**table, "path": path})
+    conn.commit()
+    conn.close()
+    return registered
+
+
+def delete_file_tables(cursor, file_id):
+    """
+    Drop the file_tables rows for ``file_id`` and return its table directory.
+    Remove the directory with discard_table_dir once the transaction has committed.
+    """
+    cursor.execute("DELETE FROM file_tables WHERE file_id = ?", (file_id,))
+    return os.path.join(TABLES_DIR, str(file_id))
+
+
+def discard_table_dir(directory):
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def get_file_tables(file_id):
+    conn = get_connection()
+    rows = conn.execute("""
+        SELECT sheet_name, path, n_rows, stats_json FROM file_tables
+        WHERE file_id = ? ORDER BY id
+    """, (file_id,)).fetchall()
+    conn.close()
+    return [
+        {"sheet_name": row["sheet_name"], "path": row["path"], "n_rows": row["n_rows"],
+         "stats": json.loads(row["stats_json"])}
+        for row in rows
+    ]
+
+
+# === Prompt context ===
+
+def _format_value(value):
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
+
+
+def describe_tables(tables):
+    """
+    Compact, prompt-friendly summary: shape, column types and aggregate stats.
+    """
+    lines = []
+    for table in tables:
+        lines.append(f"Sheet '{table['sheet_name']}': {table['n_rows']} rows, {len(table['stats'])} columns")
+        for column, stats in table["stats"].items():
+            desc = f"  - {column} ({stats['type']}): {stats['count']} values, {stats['nulls']} empty"
+            if stats["type"] in ("integer", "number") and stats["count"]:
+                desc += (f", min {_format_value(stats['min'])}, max {_format_value(stats['max'])}, "
+                         f"mean {_format_value(stats['mean'])}")
+            elif stats["type"] == "datetime" and stats["count"]:
+                desc += f", from {stats['min']} to {stats['max']}"
+            elif stats["type"] == "text" and stats["count"]:
+                desc += f", length {stats['min']}-{stats['max']}"
+            lines.append(desc)
+    return "\n".join(lines)
+
+
+def sample_preview(table, n_rows=PREVIEW_ROWS, seed=None):
+    """
+    A random sample of ``n_rows`` drawn from a few row groups, rendered as text.
+    Only the chosen row groups are read from disk.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(table["path"])
+    groups = list(range(parquet.num_row_groups))
+    if not groups:
+        return ""
+    rng = random.Random(seed)
+    chosen = sorted(rng.sample(groups, min(len(groups), 3)))
+    df = pa.concat_tables([parquet.read_row_group(i) for i in chosen]).to_pandas()
+    if len(df) > n_rows:
+        df = df.sample(n=n_rows, random_state=seed).sort_index()
+    return df.to_string(index=False, max_colwidth=60)
+
+
+def get_table_context(file_id, mode="stats", n_rows=PREVIEW_ROWS):
+    """
+    Text to include in the AI prompt for a tabular file: aggregate stats, or
+    stats plus a sampled preview. Returns None if the file has no tables.
+    """
+    tables = get_file_tables(file_id)
+    if not tables:
+        return None
+    context = describe_tables(tables)
+    if mode == "sample":
+        for table in tables:
+            context += f"\n\nSample rows from '{table['sheet_name']}':\n{sample_preview(table, n_rows)}"
+    return context
@@ -0,0 +1,221 @@
+"""
+File-backed store for extracted document text.
+
+Each upload's text is written once as plain UTF-8 to ``data/texts/<uuid>.txt``,
+and the DB keeps a small index of where every page (and every PAGE_CHARS
+piece of a long page) starts, as both a character and a byte offset. Reads
+look up the surrounding index entries and mmap just that byte range, so a
+2000-character preview of a 50 MB document touches a few KB instead of
+loading the whole TEXT column.
+
+Page boundaries are form feeds, which extract_pdf puts between PDF pages;
+other text is indexed in fixed-size pieces only.
+
+Functions take a DB cursor so that src/db.py can wrap them in its usual
+connection handling. New text is written by write_text to ``<uuid>.txt.tmp``
+before the caller's transaction starts, so a large upload never holds the
+SQLite write lock while it hits the disk; index_text then records it inside
+the transaction, and the file is only renamed into place once that has
+committed, so a failed commit never leaves an orphan file.
+
+Benchmark vs the inline column: python -m benchmarks.text_store
+"""
+import mmap
+import os
+import time
+import uuid
+
+TEXT_DIR = os.environ.get("TEXT_DIR", os.path.join("data", "texts"))
+PAGE_CHARS = int(os.environ.get("TEXT_PAGE_CHARS", 4000))
+PAGE_BREAK = "\f"
+
+
+def _index_entries(text, page_chars):
+    """
+    Yield (page, char_start, chunk) covering ``text`` in order. The form feed
+    stays at the end of its page so the stored bytes match the text exactly.
+    """
+    pieces = text.split(PAGE_BREAK)
+    char_pos = 0
+    for page, piece in enumerate(pieces, start=1):
+        if page < len(pieces):
+            piece += PAGE_BREAK
+        for offset in range(0, len(piece), page_chars):
+            chunk = piece[offset:offset + page_chars]
+            yield page, char_pos, chunk
+            char_pos += len(chunk)
+
+
+def write_text(text, page_chars=PAGE_CHARS):
+    """
+    Write ``text`` to a new temporary file and compute its index, without
+    touching the DB. Call this before the transaction begins and pass the
+    result to index_text inside it; ``staged["path"]`` then goes to
+    commit_text_file once the transaction has committed, or to
+    discard_text_file if it fails.
+    """
+    os.makedirs(TEXT_DIR, exist_ok=True)
+    path = os.path.join(TEXT_DIR, f"{uuid.uuid4().hex}.txt")
+
+    entries = []
+    n_pages = n_bytes = 0
+    with open(_tmp_path(path), "wb") as f:
+        for page, char_start, chunk in _index_entries(text or "", page_chars):
+            entries.append((char_start, page, n_bytes))
+            data = chunk.encode("utf-8", errors="replace")
+            f.write(data)
+            n_bytes += len(data)
+            n_pages = page
+    return {"path": path, "entries": entries, "n_chars": len(text or ""), "n_bytes": n_bytes, "n_pages": n_pages}
+
+
+def index_text(cursor, file_id, staged):
+    """
+    (Re)build the index of ``file_id`` for text staged by write_text.
+    """
+    cursor.execute("DELETE FROM file_text_index WHERE file_id = ?", (file_id,))
+    cursor.executemany(
+        "INSERT INTO file_text_index (file_id, char_start, page, byte_start) VALUES (?, ?, ?, ?)",
+        [(file_id, *entry) for entry in staged["entries"]],
+    )
+    cursor.execute("""
+        INSERT OR REPLACE INTO file_texts (file_id, path, n_chars, n_bytes, n_pages)
+        VALUES (?, ?, ?, ?, ?)
+    """, (file_id, staged["path"], staged["n_chars"], staged["n_bytes"], staged["n_pages"]))
+
+
+def _tmp_path(path):
+    return path + ".tmp"
+
+
+def commit_text_file(path):
+    try:
+        os.replace(_tmp_path(path), path)
+    except FileNotFoundError:
+        # recover_text_files may have renamed it first.
+        if not os.path.exists(path):
+            raise
+
+
+def discard_text_file(path):
+    try:
+        os.remove(_tmp_path(path))
+    except FileNotFoundError:
+        pass
+
+
+def recover_text_files(cursor, min_age_s=3600):
+    """
+    Finish what a crash between commit and rename left behind: temporary files
+    whose index row is committed are renamed into place, and ones older than
+    ``min_age_s`` with no row (a failed or abandoned write) are removed.
+    Returns (renamed, removed).
+    """
+    if not os.path.isdir(TEXT_DIR):
+        return 0, 0
+    renamed = removed = 0
+    for name in os.listdir(TEXT_DIR):
+        if not name.endswith(".txt.tmp"):
+            continue
+        path = os.path.join(TEXT_DIR, name[:-len(".tmp")])
+        row = cursor.execute("SELECT 1 FROM file_texts WHERE path = ?", (path,)).fetchone()
+        try:
+            if row is not None:
+                commit_text_file(path)
+                renamed += 1
+            elif time.time() - os.path.getmtime(_tmp_path(path)) > min_age_s:
+                discard_text_file(path)
+                removed += 1
+        except FileNotFoundError:
+            pass  # finished by its writer meanwhile
+    return renamed, removed
+
+
+def get_text_info(cursor, file_id):
+    row = cursor.execute(
+        "SELECT path, n_chars, n_bytes, n_pages FROM file_texts WHERE file_id = ?", (file_id,)
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def _read_bytes(path, start, end):
+    if end <= start:
+        return b""
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        # Committed but not renamed yet (or a crash in between): the text is still under its temporary name.
+        f = open(_tmp_path(path), "rb")
+    with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return mm[start:end]
+
+
+def read_text(cursor, file_id, start=0, length=None):
+    """
+    Characters ``start`` .. ``start + length`` (to the end if ``length`` is None),
+    or None if the file has no stored text.
+    """
+    info = get_text_info(cursor, file_id)
+    if info is None:
+        return None
+    if length is None:
+        length = info["n_chars"]
+    if start >= info["n_chars"] or length <= 0:
+        return ""
+
+    first = cursor.execute("""
+        SELECT char_start, byte_start FROM file_text_index
+        WHERE file_id = ? AND char_start <= ? ORDER BY char_start DESC LIMIT 1
+    """, (file_id, start)).fetchone()
+    after = cursor.execute("""
+        SELECT byte_start FROM file_text_index
+        WHERE file_id = ? AND char_start >= ? ORDER BY char_start LIMIT 1
+    """, (file_id, start + length)).fetchone()
+
+    end_byte = after["byte_start"] if after else info["n_bytes"]
+    text = _read_bytes(info["path"], first["byte_start"], end_byte).decode("utf-8")
+    skip = start - first["char_start"]
+    return text[skip:skip + length]
+
+
+def read_pages(cursor, file_id, first, last=None):
+    """
+    Text of pages ``first`` .. ``last`` (1-based, inclusive), or None if the file has no stored text.
+    """
+    info = get_text_info(cursor, file_id)
+    if info is None:
+        return None
+    last = first if last is None else last
+
+    start = cursor.execute("""
+        SELECT byte_start FROM file_text_index
+        WHERE file_id = ? AND page >= ? ORDER BY page, char_start LIMIT 1
+    """, (file_id, first)).fetchone()
+    if start is None:
+        return ""
+    end = cursor.execute("""
+        SELECT byte_start FROM file_text_index
+        WHERE file_id = ? AND page > ? ORDER BY page, char_start LIMIT 1
+    """, (file_id, last)).fetchone()
+
+    end_byte = end["byte_start"] if end else info["n_bytes"]
+    text = _read_bytes(info["path"], start["byte_start"], end_byte).decode("utf-8")
+    return text.removesuffix(PAGE_BREAK)
+
+
+def delete_text(cursor, file_id):
+    """
+    Drop the index rows for ``file_id`` and return the text file's path (or None).
+    Remove the file with remove_text_file once the transaction has committed.
+    """
+    info = get_text_info(cursor, file_id)
+    cursor.execute("DELETE FROM file_text_index WHERE file_id = ?", (file_id,))
+    cursor.execute("DELETE FROM file_texts WHERE file_id = ?", (file_id,))
+    return info["path"] if info else None
+
+
+def remove_text_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,26 +1,152 @@
-from gtts import gTTS
-import pygame
+import hashlib
 import os
+import re
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 
 AUDIO_DIR = "temp_audio"
-os.makedirs(AUDIO_DIR, exist_ok=True)
+TTS_BACKEND = os.environ.get("TTS_BACKEND", "gtts")
+TTS_WORKERS = int(os.environ.get("TTS_WORKERS", 4))
+TTS_CACHE_MAX_BYTES = int(os.environ.get("TTS_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+MAX_CHUNK_CHARS = 300
+
+
+class GTTSSynthesizer:
+    name = "gtts"
+
+    def synthesize(self, text, lang):
+        import io
+        from gtts import gTTS
+
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=lang).write_to_fp(buffer)
+        return buffer.getvalue()
+
+
+class StubSynthesizer:
+    """
+    Offline synthesizer for tests: returns the text as bytes after an optional delay.
+    """
+    name = "stub"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def synthesize(self, text, lang):
+        time.sleep(self.latency)
+        return f"[{lang}] {text}\n".encode("utf-8")
+
+
+_SYNTHESIZERS = {"gtts": GTTSSynthesizer, "stub": StubSynthesizer}
 
-def speak_text(text, lang="en"):
-    st.session_state["audio_playing"] = True
 
-    filename = os.path.join(AUDIO_DIR, f"{uuid.uuid4().hex}.mp3")
+def get_synthesizer(name=None):
+    return _SYNTHESIZERS[name or TTS_BACKEND]()
 
-    tts = gTTS(text=text, lang=lang)
-    tts.save(filename)
 
-    pygame.mixer.init()
-    pygame.mixer.music.load(filename)
-    pygame.mixer.music.play()
+def split_sentences(text, max_chars=MAX_CHUNK_CHARS):
+    """
+    Split on sentence boundaries (including the Hindi danda) and pack sentences
+    into chunks of at most ``max_chars`` so each synthesis request stays small.
+    """
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?।])\s+", text.strip()) if s.strip()]
+    chunks, current = [], ""
+    for sentence in sentences:
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if not current:
+            current = sentence
+        elif len(current) + 1 + len(sentence) <= max_chars:
+            current = f"{current} {sentence}"
+        else:
+            chunks.append(current)
+            current = sentence
+    if current:
+        chunks.append(current)
+    return chunks
 
-    # Keep checking for cancel flag
-    while pygame.mixer.music.get_busy():
-        if st.session_state.get("cancel_tts", False):
-            pygame.mixer.music.stop()
+
+def _cache_path(text, lang, synthesizer):
+    key = hashlib.sha256(f"{synthesizer.name}\0{lang}\0{text}".encode("utf-8")).hexdigest()
+    return os.path.join(AUDIO_DIR, f"{key}.mp3")
+
+
+def evict_cache(max_bytes=TTS_CACHE_MAX_BYTES):
+    """
+    Delete least-recently-used entries until the cache fits in ``max_bytes``.
+    Cache hits touch the file's mtime, so mtime order is LRU order. Only
+    finished ``.mp3`` files count: ``.tmp`` files belong to writes in progress.
+    """
+    if not os.path.isdir(AUDIO_DIR):
+        return 0
+    entries = []
+    for name in os.listdir(AUDIO_DIR):
+        if not name.endswith(".mp3"):
+            continue
+        path = os.path.join(AUDIO_DIR, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
             break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def synthesize(text, lang="en", synthesizer=None, max_workers=TTS_WORKERS):
+    """
+    Return MP3 bytes for ``text``, from the disk cache when possible.
+    Long texts are split into sentence chunks synthesized in parallel; MP3
+    frames can be concatenated directly, so the pieces are simply joined.
+    """
+    synthesizer = synthesizer or get_synthesizer()
+    path = _cache_path(text, lang, synthesizer)
+    try:
+        with open(path, "rb") as f:
+            audio = f.read()
+        os.utime(path)
+        return audio
+    except FileNotFoundError:
+        pass
+
+    chunks = split_sentences(text) or [text]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        audio = b"".join(pool.map(lambda chunk: synthesizer.synthesize(chunk, lang), chunks))
+
+    os.makedirs(AUDIO_DIR, exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(audio)
+    os.replace(tmp_path, path)
+    evict_cache()
+    return audio
+
+
+def speak_text(text, lang="en"):
+    """
+    Synthesize ``text`` and hand it to the browser's audio player. Returns
+    immediately; playback and stopping happen client-side.
+    """
+    audio = synthesize(text, lang)
+    st.audio(audio, format="audio/mp3")
+    return audio
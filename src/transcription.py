@@ -0,0 +1,169 @@
+"""
+Chunked, parallel speech-to-text.
+
+Long recordings are split on silence with pydub, each chunk is transcribed
+concurrently through a pluggable backend, and the pieces are joined back in
+order. Results are cached by the SHA-256 of the audio bytes, and every
+intermediate file lives in a TemporaryDirectory that is removed when the
+call returns.
+
+Backends (TRANSCRIPTION_BACKEND env var):
+    openai  - OpenAI Whisper API (default)
+    local   - faster-whisper running on this machine
+    stub    - deterministic offline fake, for tests and benchmarks
+"""
+import hashlib
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.db import get_cached_transcript, save_transcript
+
+TRANSCRIPTION_BACKEND = os.environ.get("TRANSCRIPTION_BACKEND", "openai")
+TRANSCRIPTION_WORKERS = int(os.environ.get("TRANSCRIPTION_WORKERS", 4))
+
+# Chunking: split on pauses, then merge neighbouring pieces up to MAX_CHUNK_MS
+# so we don't send hundreds of one-word requests.
+MIN_SILENCE_MS = 700
+SILENCE_OFFSET_DB = 16
+KEEP_SILENCE_MS = 200
+MAX_CHUNK_MS = 60_000
+SAMPLE_RATE = 16_000
+
+
+class OpenAIBackend:
+    name = "openai"
+
+    def __init__(self, model="whisper-1"):
+        self.model = model
+
+    def transcribe(self, path, language=None):
+        import openai
+
+        kwargs = {"language": language} if language else {}
+        with open(path, "rb") as f:
+            if hasattr(openai, "OpenAI"):
+                result = openai.OpenAI().audio.transcriptions.create(model=self.model, file=f, **kwargs)
+                return result.text
+            # openai < 1.0
+            return openai.Audio.transcribe(self.model, f, **kwargs)["text"]
+
+
+class LocalWhisperBackend:
+    name = "local"
+
+    def __init__(self, model_size=os.environ.get("LOCAL_WHISPER_MODEL", "base")):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(model_size, device="auto", compute_type="int8")
+
+    def transcribe(self, path, language=None):
+        segments, _ = self.model.transcribe(path, language=language)
+        return " ".join(segment.text.strip() for segment in segments)
+
+
+class StubBackend:
+    """
+    Offline stand-in: returns "[chunk <n> ms]" for each chunk and can simulate
+    API latency as a fraction of the audio length (``realtime_factor``).
+    """
+    name = "stub"
+
+    def __init__(self, realtime_factor=0.0, fixed_latency=0.0):
+        self.realtime_factor = realtime_factor
+        self.fixed_latency = fixed_latency
+
+    def transcribe(self, path, language=None):
+        from pydub import AudioSegment
+
+        duration_ms = len(AudioSegment.from_file(path))
+        time.sleep(self.fixed_latency + duration_ms / 1000 * self.realtime_factor)
+        return f"[chunk {duration_ms} ms]"
+
+
+_BACKENDS = {"openai": OpenAIBackend, "local": LocalWhisperBackend, "stub": StubBackend}
+_backend_instances = {}
+
+
+def get_backend(name=None):
+    name = name or TRANSCRIPTION_BACKEND
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown transcription backend: {name}")
+    if name not in _backend_instances:
+        _backend_instances[name] = _BACKENDS[name]()
+    return _backend_instances[name]
+
+
+def split_audio(audio, max_chunk_ms=MAX_CHUNK_MS):
+    """
+    Split an AudioSegment on silence and pack the pieces into chunks of at most
+    ``max_chunk_ms``. Pieces longer than that (no pauses) are cut hard.
+    """
+    from pydub.silence import split_on_silence
+
+    if len(audio) <= max_chunk_ms:
+        return [audio]
+
+    pieces = split_on_silence(
+        audio,
+        min_silence_len=MIN_SILENCE_MS,
+        silence_thresh=audio.dBFS - SILENCE_OFFSET_DB,
+        keep_silence=KEEP_SILENCE_MS,
+        seek_step=10,
+    ) or [audio]
+
+    chunks, current = [], None
+    for piece in pieces:
+        while len(piece) > max_chunk_ms:
+            if current is not None:
+                chunks.append(current)
+                current = None
+            chunks.append(piece[:max_chunk_ms])
+            piece = piece[max_chunk_ms:]
+        if current is None:
+            current = piece
+        elif len(current) + len(piece) <= max_chunk_ms:
+            current += piece
+        else:
+            chunks.append(current)
+            current = piece
+    if current is not None and len(current):
+        chunks.append(current)
+    return chunks
+
+
+def transcribe_audio(data, suffix=".mp3", language=None, backend=None, max_workers=TRANSCRIPTION_WORKERS,
+                     use_cache=True):
+    """
+    Transcribe raw audio bytes and return the text. ``language`` is an ISO-639-1 code ("en", "hi").
+    """
+    from pydub import AudioSegment
+
+    backend = backend or get_backend()
+    audio_hash = hashlib.sha256(data).hexdigest()
+    cache_key = f"{backend.name}:{language or 'auto'}"
+    if use_cache:
+        cached = get_cached_transcript(audio_hash, cache_key)
+        if cached is not None:
+            return cached
+
+    with tempfile.TemporaryDirectory(prefix="voice-") as tmp:
+        source_path = os.path.join(tmp, f"source{suffix}")
+        with open(source_path, "wb") as f:
+            f.write(data)
+
+        audio = AudioSegment.from_file(source_path).set_channels(1).set_frame_rate(SAMPLE_RATE)
+        chunk_paths = []
+        for i, chunk in enumerate(split_audio(audio)):
+            path = os.path.join(tmp, f"chunk_{i:04d}.wav")
+            chunk.export(path, format="wav")
+            chunk_paths.append(path)
+
+        # pool.map keeps results in chunk order regardless of completion order.
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunk_paths)))) as pool:
+            texts = list(pool.map(lambda p: backend.transcribe(p, language=language), chunk_paths))
+
+    text = " ".join(t.strip() for t in texts if t and t.strip())
+    if use_cache:
+        save_transcript(audio_hash, cache_key, text)
+    return text
@@ -1,9 +1,23 @@
-from googletrans import Translator
+import streamlit as st
 
-translator = Translator()
+from src.shared_cache import get_cache, make_key
+
+
+@st.cache_resource(show_spinner=False)
+def get_translator():
+    # googletrans is slow to import, so only load it when a translation is requested.
+    from googletrans import Translator
+    return Translator()
+
+def translate(text, src_lang, dest_lang):
+    return get_cache().get_or_compute(
+        "translation",
+        make_key(src_lang, dest_lang, text),
+        lambda: get_translator().translate(text, src=src_lang, dest=dest_lang).text,
+    )
 
 def to_english(text, src_lang="hi"):
-    return translator.translate(text, src=src_lang, dest="en").text
+    return translate(text, src_lang, "en")
 
 def to_hindi(text, src_lang="en"):
-    return translator.translate(text, src=src_lang, dest="hi").text
+    return translate(text, src_lang, "hi")
@@ -0,0 +1,173 @@
+"""
+Background processing of uploaded files.
+
+Uploads are spooled to disk and recorded as rows in ``upload_jobs``; a
+bounded thread pool extracts and saves them while the UI only polls the
+job table. Because both the file bytes and the job state are persisted,
+jobs that were queued or running when the process died are picked up
+again. A claim is a lease: every process renews ``updated_at`` on the jobs
+it is running, and a running job whose lease has expired is requeued by
+whichever process notices first (on start and then periodically).
+"""
+import hashlib
+import io
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from src.db import (
+    create_upload_job, claim_upload_job, finish_upload_job, heartbeat_upload_jobs,
+    requeue_stale_upload_jobs, get_upload_jobs, save_uploaded_file
+)
+from src.file_reader import extract_document
+from src.tabular import register_file_tables, discard_tables, table_kind
+from src.shared_cache import get_cache, make_key
+
+SPOOL_DIR = os.environ.get("UPLOAD_SPOOL_DIR", os.path.join("data", "uploads"))
+UPLOAD_WORKERS = int(os.environ.get("UPLOAD_WORKERS", min(4, os.cpu_count() or 1)))
+# A job whose worker died this many times (e.g. a file that crashes the extractor) is failed for good.
+UPLOAD_MAX_ATTEMPTS = int(os.environ.get("UPLOAD_MAX_ATTEMPTS", 3))
+
+# A running job whose worker hasn't renewed its lease for this long is taken over.
+UPLOAD_LEASE_S = int(os.environ.get("UPLOAD_LEASE_S", 60))
+
+# Unique per process start, so a restarted process that reuses a PID (PID 1 in a
+# container) never mistakes the dead process's claims for its own.
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class SpooledUpload(io.BytesIO):
+    """
+    Stand-in for Streamlit's UploadedFile, so extract_file works on spooled bytes.
+    """
+
+    def __init__(self, data, name, type):
+        super().__init__(data)
+        self.name = name
+        self.type = type
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+            threading.Thread(target=_lease_loop, name="upload-lease", daemon=True).start()
+        return _executor
+
+
+def _lease_loop():
+    while True:
+        time.sleep(UPLOAD_LEASE_S / 3)
+        try:
+            heartbeat_upload_jobs(WORKER_ID)
+            _requeue_stale()
+        except Exception as e:
+            print(f"[upload_jobs] lease refresh failed: {e}")
+
+
+def _requeue_stale():
+    job_ids = requeue_stale_upload_jobs(WORKER_ID, UPLOAD_LEASE_S)
+    executor = _get_executor()
+    for job_id in job_ids:
+        executor.submit(process_job, job_id)
+    return len(job_ids)
+
+
+def enqueue_upload(user_email, uploaded_file):
+    """
+    Spool ``uploaded_file`` to disk, record a queued job and hand it to the worker pool.
+    """
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    spool_path = os.path.join(SPOOL_DIR, f"{uuid.uuid4().hex}.upload")
+    with open(spool_path, "wb") as f:
+        f.write(uploaded_file.getvalue() if hasattr(uploaded_file, "getvalue") else uploaded_file.read())
+
+    job_id = create_upload_job(user_email, uploaded_file.name, uploaded_file.type, spool_path)
+    _get_executor().submit(process_job, job_id)
+    return job_id
+
+
+def _remove_spool(job):
+    try:
+        os.remove(job["spool_path"])
+    except OSError:
+        pass
+
+
+def _fail_job(job, error, file_id=None):
+    finish_upload_job(job["id"], "failed", file_id=file_id, error=error)
+    _remove_spool(job)
+
+
+def process_job(job_id):
+    job = claim_upload_job(job_id, WORKER_ID)
+    if not job:
+        return None
+    if job["attempts"] > UPLOAD_MAX_ATTEMPTS:
+        _fail_job(job, f"Gave up after {UPLOAD_MAX_ATTEMPTS} attempts (processing stopped unexpectedly).")
+        return None
+
+    try:
+        with open(job["spool_path"], "rb") as f:
+            data = f.read()
+        upload = SpooledUpload(data, job["file_name"], job["file_type"])
+        if table_kind(upload):
+            # Spreadsheets produce per-file Parquet tables, so they are always ingested.
+            extracted_text, tables = extract_document(upload)
+        else:
+            cache_key = make_key(job["file_type"], hashlib.sha256(data).hexdigest())
+            extracted_text = get_cache().get_or_compute(
+                "extraction", cache_key, lambda: extract_document(upload)[0]
+            )
+            tables = []
+    except Exception as e:
+        _fail_job(job, str(e))
+        return None
+
+    try:
+        # Marks the job done atomically with the insert.
+        file_id = save_uploaded_file(
+            job["user_email"], job["file_name"], job["file_type"], extracted_text, job_id=job_id
+        )
+    except Exception as e:
+        discard_tables(tables)
+        _fail_job(job, str(e))
+        return None
+
+    try:
+        register_file_tables(file_id, tables)
+    except Exception as e:
+        discard_tables(tables)
+        _fail_job(job, f"Saved the text, but not the tables: {e}", file_id=file_id)
+        return None
+
+    _remove_spool(job)
+    return file_id
+
+
+def resume_pending_jobs():
+    """
+    Requeue running jobs whose lease has expired and resubmit everything queued.
+    Jobs of a process that died moments ago are picked up by the lease loop
+    once their lease runs out. A job that has already been claimed
+    UPLOAD_MAX_ATTEMPTS times is failed when it is next claimed, so a file
+    that kills its worker can't loop forever.
+    """
+    requeue_stale_upload_jobs(WORKER_ID, UPLOAD_LEASE_S)
+
+    queued = get_upload_jobs(status="queued")
+    executor = _get_executor()
+    for job in reversed(queued):
+        executor.submit(process_job, job["id"])
+    return len(queued)
+
+
+def has_active_jobs(jobs):
+    return any(job["status"] in ("queued", "running") for job in jobs)
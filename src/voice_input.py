@@ -1,21 +1,23 @@
 # src/voice_input.py
-import openai
+import os
 import streamlit as st
-import tempfile
 
-def get_voice_input():
-    st.info("📤 Upload an audio file (WAV, MP3, M4A,txt,pdf)")
-    audio_file = st.file_uploader("Upload your voice input", type=["wav", "mp3", "m4a","txt","pdf","xlsx"])
+from src.transcription import transcribe_audio
+
+def get_voice_input(language=None):
+    """
+    Let the user upload a recording and return its transcript (or None).
+    ``language`` may be a locale like "hi-IN"; only the language part is sent to the backend.
+    """
+    st.info("📤 Upload an audio file (WAV, MP3, M4A)")
+    audio_file = st.file_uploader("Upload your voice input", type=["wav", "mp3", "m4a"])
     
     if audio_file is not None:
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3",prefix = ".txt") as tmp_file:
-                tmp_file.write(audio_file.read())
-                tmp_path = tmp_file.name
-
-            with open(tmp_path, "rb") as f:
-                transcription = openai.Audio.transcribe(f)
-                return transcription["text"]
+            suffix = os.path.splitext(audio_file.name)[1] or ".mp3"
+            lang = language.split("-")[0] if language else None
+            with st.spinner("Transcribing... 🎙️"):
+                return transcribe_audio(audio_file.getvalue(), suffix=suffix, language=lang)
         except Exception as e:
             st.error(f"❌ API error: {e}")
     return None
@@ -0,0 +1,20 @@
+"""
+Cold-start guard: app.py's top-level imports must stay free of heavy SDKs
+and within the import-time budget of src/import_profile.py.
+"""
+from src.import_profile import HEAVY_MODULES, app_modules, check, profile_imports
+
+
+def test_app_imports_are_found():
+    modules = app_modules()
+    assert "src.db" in modules
+    assert all(name.startswith("src.") for name in modules)
+
+
+def test_no_heavy_module_at_startup():
+    loaded = {name for name, _, _ in profile_imports()}
+    assert not loaded & set(HEAVY_MODULES)
+
+
+def test_import_profile_within_budget():
+    assert check()
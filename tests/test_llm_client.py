@@ -0,0 +1,130 @@
+"""
+Fault-injection tests for the LLM call layer, against FakeBackend.
+"""
+import itertools
+import time
+
+import pytest
+
+from src.llm_client import (
+    CircuitBreaker, FakeBackend, LLMRequestError, LLMUnavailableError, ResilientLLM, is_retryable
+)
+
+FALLBACK = ["fallback-model"]
+
+
+def make_client(backend, **kwargs):
+    options = {"model": "primary", "fallback_models": FALLBACK, "backoff_base_s": 0.001, "hedge": False}
+    options.update(kwargs)
+    return ResilientLLM(backend, **options)
+
+
+def test_transient_failures_are_retried_away():
+    client = make_client(FakeBackend(failure_rate=0.3, seed=1))
+    results = [client.generate(f"q{i}") for i in range(50)]
+    assert all(r.startswith("[") for r in results)
+    assert client.stats["retries"] > 0
+    assert client.stats["failures"] == 0
+
+
+def test_slow_tail_requests_are_hedged():
+    # Every 25th backend call takes 1 s: rare enough to stay above the p95, and the
+    # hedge sent for it (the next call) is fast.
+    calls = itertools.count(1)
+    backend = FakeBackend(latency=lambda: 1.0 if next(calls) % 25 == 0 else 0.01)
+    client = make_client(backend, fallback_models=[], hedge=True, hedge_default_s=0.05)
+    start = time.monotonic()
+    for i in range(100):
+        client.generate(f"q{i}")
+    assert client.stats["hedges"] >= 3
+    assert client.stats["hedge_wins"] >= 3
+    # Without hedging the four slow calls alone would take 4 s.
+    assert time.monotonic() - start < 3.5
+
+
+def test_dead_primary_trips_breaker_and_falls_back():
+    client = make_client(FakeBackend(down_models={"primary"}), retries=1)
+    for i in range(20):
+        assert client.generate(f"q{i}").startswith("[fallback-model]")
+    assert client.breakers["primary"].state == "open"
+    assert client.stats["fast_fails"] > 0
+
+
+def test_hung_backend_hits_the_timeout():
+    client = make_client(FakeBackend(hang_rate=1.0, hang_s=1.0), fallback_models=[], timeout=0.2, retries=0)
+    start = time.monotonic()
+    with pytest.raises(LLMUnavailableError):
+        client.generate("q")
+    assert time.monotonic() - start < 0.9
+
+
+def test_everything_down_raises_instead_of_answering():
+    client = make_client(FakeBackend(down_models={"primary", "fallback-model"}), retries=0)
+    for _ in range(12):
+        with pytest.raises(LLMUnavailableError):
+            client.generate("q")
+    assert client.stats["fast_fails"] > 0
+
+
+def test_rejected_prompt_is_not_retried_or_counted():
+    backend = FakeBackend(failure_rate=1.0, failure_error=ValueError)
+    client = make_client(backend)
+    for i in range(3):
+        with pytest.raises(LLMRequestError):
+            client.generate(f"blocked {i}")
+    assert backend.calls == 3
+    assert client.stats["retries"] == 0 and client.stats["fallbacks"] == 0
+    assert all(breaker.state == "closed" for breaker in client.breakers.values())
+
+
+def test_rejected_prompt_does_not_block_other_users():
+    backend = FakeBackend(failure_rate=1.0, failure_error=ValueError)
+    client = make_client(backend)
+    for i in range(10):
+        with pytest.raises(LLMRequestError):
+            client.generate(f"blocked {i}")
+    backend.failure_rate = 0.0
+    assert client.generate("a normal question").startswith("[primary]")
+
+
+def test_stream_falls_back_before_the_first_chunk():
+    client = make_client(FakeBackend(down_models={"primary"}), retries=0)
+    assert "".join(client.stream("q")).startswith("[fallback-model]")
+
+
+def test_stream_rejection_is_raised_at_once():
+    backend = FakeBackend(failure_rate=1.0, failure_error=ValueError)
+    client = make_client(backend)
+    with pytest.raises(LLMRequestError):
+        list(client.stream("blocked"))
+    assert backend.calls == 1
+    assert client.breakers["primary"].state == "closed"
+
+
+class _ApiError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (RuntimeError("connection reset"), True),
+    (_ApiError(503), True),
+    (_ApiError(429), True),
+    (_ApiError(400), False),
+    (_ApiError(403), False),
+    (ValueError("response was blocked"), False),
+])
+def test_error_classification(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def test_breaker_half_opens_after_reset():
+    breaker = CircuitBreaker(failure_threshold=2, reset_s=0.05)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.state == "half-open" and breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
@@ -0,0 +1,67 @@
+"""
+Semantic prompt cache against the offline KeywordEmbedder.
+"""
+import pytest
+
+pytest.importorskip("numpy")
+
+from benchmarks.semantic_cache import DIFFERENT, PARAPHRASES
+from src.semantic_cache import KeywordEmbedder, SemanticCache, normalize_prompt
+
+
+def make_cache(**kwargs):
+    return SemanticCache(embedder=KeywordEmbedder(), **kwargs)
+
+
+def test_reworded_question_is_a_hit():
+    cache = make_cache()
+    cache.store("What are the symptoms of diabetes?", "answer", user="a@example.com", latency=2.0)
+    assert cache.lookup("symptoms of diabetes", user="a@example.com") == "answer"
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["latency_saved_s"] == 2.0
+
+
+def test_different_question_is_a_miss():
+    cache = make_cache()
+    cache.store("What was the revenue of Apple in 2021?", "2021 answer", user="a@example.com")
+    assert cache.lookup("What was the revenue of Apple in 2022?", user="a@example.com") is None
+    assert cache.stats()["hits"] == 0
+
+
+def test_entries_are_scoped_per_user_and_context():
+    cache = make_cache()
+    cache.store("Summarize this file", "summary of report.pdf", user="a@example.com", context="report.pdf text")
+    assert cache.lookup("Summarize this file", user="b@example.com", context="report.pdf text") is None
+    assert cache.lookup("Summarize this file", user="a@example.com") is None
+    assert cache.lookup("Summarize this file", user="a@example.com", context="notes.txt text") is None
+    assert cache.lookup("summarize this file", user="a@example.com", context="report.pdf text") \
+        == "summary of report.pdf"
+
+
+def test_global_scope_is_shared():
+    cache = make_cache(scope="global")
+    cache.store("Why is the sky blue?", "scattering", user="a@example.com")
+    assert cache.lookup("why is the sky blue", user="b@example.com") == "scattering"
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(max_entries=2)
+    cache.store("capital of France", "Paris", user="a@example.com")
+    cache.store("capital of Germany", "Berlin", user="a@example.com")
+    assert cache.lookup("capital of France", user="a@example.com") == "Paris"
+    cache.store("capital of Italy", "Rome", user="a@example.com")
+
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup("capital of Germany", user="a@example.com") is None
+    assert cache.lookup("capital of France", user="a@example.com") == "Paris"
+    assert cache.lookup("capital of Italy", user="a@example.com") == "Rome"
+
+
+def test_threshold_separates_the_benchmark_pairs():
+    embedder = KeywordEmbedder()
+
+    def similarity(a, b):
+        return float(embedder.embed(normalize_prompt(a)) @ embedder.embed(normalize_prompt(b)))
+
+    assert all(similarity(a, b) < embedder.threshold for a, b in DIFFERENT)
+    assert sum(similarity(a, b) >= embedder.threshold for a, b in PARAPHRASES) >= len(PARAPHRASES) // 2
@@ -0,0 +1,80 @@
+"""
+Sentence splitting, caching and cache eviction of text-to-speech, against StubSynthesizer.
+"""
+import os
+import time
+
+import pytest
+
+from src import text_to_speech
+from src.text_to_speech import StubSynthesizer, evict_cache, split_sentences, synthesize
+
+
+@pytest.fixture(autouse=True)
+def audio_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_to_speech, "AUDIO_DIR", str(tmp_path))
+    return tmp_path
+
+
+class CountingSynthesizer(StubSynthesizer):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def synthesize(self, text, lang):
+        self.calls.append(text)
+        return super().synthesize(text, lang)
+
+
+def test_split_packs_sentences_into_chunks():
+    text = "First sentence. Second one! Third? पहला वाक्य। दूसरा वाक्य।"
+    assert split_sentences(text, max_chars=1000) == [text]
+    chunks = split_sentences(text, max_chars=20)
+    assert chunks == ["First sentence.", "Second one! Third?", "पहला वाक्य।", "दूसरा वाक्य।"]
+
+
+def test_split_breaks_overlong_sentences_on_spaces():
+    chunks = split_sentences("word " * 30, max_chars=20)
+    assert all(len(chunk) <= 20 for chunk in chunks)
+    assert " ".join(chunks).split() == ["word"] * 30
+
+
+def test_chunks_are_joined_in_order():
+    text = " ".join(f"Sentence number {i}." for i in range(40))
+    audio = synthesize(text, synthesizer=StubSynthesizer(), max_workers=8)
+    expected = b"".join(f"[en] {chunk}\n".encode() for chunk in split_sentences(text))
+    assert audio == expected
+
+
+def test_second_request_is_a_cache_hit(audio_dir):
+    synthesizer = CountingSynthesizer()
+    first = synthesize("Hello there.", synthesizer=synthesizer)
+    second = synthesize("Hello there.", synthesizer=synthesizer)
+    assert first == second
+    assert synthesizer.calls == ["Hello there."]
+    assert synthesize("Hello there.", lang="hi", synthesizer=synthesizer) != first
+    assert len(synthesizer.calls) == 2
+    assert not [name for name in os.listdir(audio_dir) if not name.endswith(".mp3")]
+
+
+def test_eviction_removes_least_recently_used(audio_dir):
+    synthesizer = StubSynthesizer()
+    texts = ["Alpha.", "Bravo.", "Delta."]
+    paths = []
+    for age, text in zip((30, 20, 10), texts):
+        synthesize(text, synthesizer=synthesizer)
+        path = text_to_speech._cache_path(text, "en", synthesizer)
+        os.utime(path, (time.time() - age, time.time() - age))
+        paths.append(path)
+    synthesize("Alpha.", synthesizer=synthesizer)  # the hit makes Alpha the most recent
+
+    size = os.path.getsize(paths[0])
+    assert evict_cache(max_bytes=2 * size) == 1
+    assert [os.path.exists(path) for path in paths] == [True, False, True]
+
+
+def test_eviction_skips_writes_in_progress(audio_dir):
+    pending = audio_dir / "abc.mp3.1234.tmp"
+    pending.write_bytes(b"x" * 100)
+    assert evict_cache(max_bytes=0) == 0
+    assert pending.exists()
@@ -0,0 +1,87 @@
+"""
+Chunked transcription against StubBackend: chunk order, the audio-hash cache
+and temp-file cleanup.
+"""
+import io
+import os
+import re
+import tempfile
+
+import pytest
+
+pytest.importorskip("pydub")
+
+from benchmarks.common import isolated_data_dir
+from src.transcription import SAMPLE_RATE, StubBackend, transcribe_audio
+
+
+@pytest.fixture(autouse=True)
+def data_dir():
+    with isolated_data_dir() as tmp:
+        yield tmp
+
+
+def make_audio(*tone_seconds):
+    """
+    WAV bytes of tones of the given lengths, each followed by 1 s of silence.
+    """
+    from pydub import AudioSegment
+    from pydub.generators import Sine
+
+    second = Sine(440).to_audio_segment(duration=1_000, volume=-10)
+    audio = AudioSegment.silent(0)
+    for seconds in tone_seconds:
+        audio += second * seconds + AudioSegment.silent(1_000)
+    buffer = io.BytesIO()
+    audio.set_frame_rate(SAMPLE_RATE).set_channels(1).export(buffer, format="wav")
+    return buffer.getvalue()
+
+
+class CountingBackend(StubBackend):
+    def __init__(self, fail_on_chunk=None, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.fail_on_chunk = fail_on_chunk
+
+    def transcribe(self, path, language=None):
+        self.calls += 1
+        if self.fail_on_chunk is not None and os.path.basename(path) == f"chunk_{self.fail_on_chunk:04d}.wav":
+            raise RuntimeError("backend error")
+        return super().transcribe(path, language)
+
+
+def test_chunks_are_joined_in_order():
+    # Three chunks, longest first; with latency proportional to length the first
+    # chunk finishes last, but its text must still come first.
+    data = make_audio(50, 40, 30)
+    text = transcribe_audio(data, ".wav", backend=StubBackend(realtime_factor=0.01), max_workers=3,
+                            use_cache=False)
+    durations = [int(ms) for ms in re.findall(r"\[chunk (\d+) ms\]", text)]
+    assert len(durations) == 3
+    assert durations == sorted(durations, reverse=True)
+
+
+def test_cache_is_keyed_by_audio_hash():
+    backend = CountingBackend()
+    data = make_audio(2)
+    first = transcribe_audio(data, ".wav", backend=backend)
+    assert transcribe_audio(data, ".wav", backend=backend) == first
+    assert backend.calls == 1
+
+    transcribe_audio(make_audio(3), ".wav", backend=backend)
+    assert backend.calls == 2
+    transcribe_audio(data, ".wav", language="hi", backend=backend)
+    assert backend.calls == 3
+
+
+def test_temp_files_are_removed_when_a_chunk_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    backend = CountingBackend(fail_on_chunk=1)
+    data = make_audio(50, 40)
+    with pytest.raises(RuntimeError, match="backend error"):
+        transcribe_audio(data, ".wav", backend=backend)
+    assert os.listdir(tmp_path) == []
+
+    backend.fail_on_chunk = None
+    transcribe_audio(data, ".wav", backend=backend)
+    assert backend.calls == 4  # the failure was not cached